@@ -0,0 +1,87 @@
+"""
+Benchmark for the opentdb client under an outage, against a local fake server.
+
+Runs a QuestionPool on a QuizAPI pointed at benchmarks.fake_opentdb and
+times question requests in three phases: healthy, with the server hung
+(every request times out until the circuit breaker opens, after which
+calls fail fast and the pool repeats recent questions), and recovered
+(the breaker's probe succeeds and fresh questions flow again). Intervals
+and timeouts are scaled down so the run takes seconds rather than minutes.
+
+    python -m benchmarks.bench_api_resilience --requests 200 --read-timeout 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('ADMIN_ID', '1')
+
+from benchmarks.fake_opentdb import FakeOpenTDB
+from src.api.question_pool import QuestionPool
+from src.api.quiz_api import QuizAPI
+from src.utils.circuit_breaker import CircuitBreaker
+
+async def timed_gets(pool: QuestionPool, count: int):
+    latencies = []
+    served = fresh = 0
+    seen = set()
+    for _ in range(count):
+        start = time.perf_counter()
+        question = await pool.get()
+        latencies.append(time.perf_counter() - start)
+        if question is not None:
+            served += 1
+            fresh += question['id'] not in seen
+            seen.add(question['id'])
+    latencies.sort()
+    return served, fresh, latencies
+
+def report(phase: str, api: QuizAPI, served: int, fresh: int, latencies):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    metrics = api.metrics()
+    print(f"{phase:>10}: {served}/{len(latencies)} served ({fresh} distinct), "
+          f"p50 {p50:.2f} ms, p99 {p99:.1f} ms, max {latencies[-1] * 1000:.0f} ms, "
+          f"breaker {metrics['breaker']['state']}, {metrics['requests']} requests, "
+          f"{metrics['retries']} retries, {metrics['breaker']['refused']} refused")
+
+async def run(args):
+    server = FakeOpenTDB(rate_limit=True, min_interval=args.min_interval, port=args.port)
+    await server.start()
+    api = QuizAPI(
+        base_url=server.url, read_timeout=args.read_timeout, request_timeout=args.read_timeout * 2,
+        min_interval=args.min_interval, max_retries=2,
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=args.reset_timeout)
+    )
+    pool = QuestionPool(api, batch_size=20, low_watermark=5, high_watermark=40)
+    try:
+        report('healthy', api, *await timed_gets(pool, args.requests))
+
+        server.down = True
+        report('outage', api, *await timed_gets(pool, args.requests))
+
+        server.down = False
+        await asyncio.sleep(args.reset_timeout)
+        # Let the probe through and the pool refill before timing
+        await pool.warm((None, None))
+        report('recovered', api, *await timed_gets(pool, args.requests))
+        print(f"server: {server.metrics}")
+    finally:
+        await pool.close()
+        await api.close()
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--read-timeout', type=float, default=0.3)
+    parser.add_argument('--min-interval', type=float, default=0.1)
+    parser.add_argument('--reset-timeout', type=float, default=2.0)
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Microbenchmarks for callback_data encoding, parsing and dispatch.
+
+Compares the compact versioned codes with the old text prefixes handled by
+a startswith chain, per callback, without touching Telegram or the
+database.
+
+    python -m benchmarks.bench_callbacks --number 200000
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('ADMIN_ID', '1')
+
+from src.handlers import callbacks
+
+async def _handler(*args):
+    pass
+
+DISPATCH = {
+    callbacks.ANSWER: _handler,
+    callbacks.DIFFICULTY: _handler,
+    callbacks.LANGUAGE: _handler,
+}
+
+def legacy_chain(data):
+    """The startswith chain callback_query_handler used before the compact codes,
+    when answer buttons carried the option text."""
+    if data.startswith('difficulty_'):
+        return _handler, (data.split('_')[1],)
+    elif data.startswith('quiz_'):
+        return _handler, (data[5:],)
+    elif data.startswith('lang_'):
+        return _handler, (data[5:],)
+    return None
+
+def dispatch(data):
+    parsed = callbacks.parse(data)
+    if parsed is None:
+        return None
+    action, args = parsed
+    return DISPATCH[action], args
+
+CASES = {
+    'answer': (callbacks.encode_answer(0x1234abcd, 2), 'quiz_The Treaty of Westphalia'),
+    'difficulty': (callbacks.encode_difficulty('medium'), 'difficulty_medium'),
+    'language': (callbacks.encode_language('fr'), 'lang_fr'),
+    'malformed': ('1q:nothex!!:2', 'unknown_x'),
+}
+
+def per_call_ns(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args()
+
+    encode = per_call_ns(lambda: callbacks.encode_answer(0x1234abcd, 2), args.number)
+    print(f"encode_answer: {encode:.0f} ns, {len(callbacks.encode_answer(0xffffffff, 15))} bytes max")
+    print(f"{'case':<12}{'parse':>10}{'dispatch':>11}{'legacy':>10}  bytes (new/old)")
+    for name, (data, legacy) in CASES.items():
+        parse = per_call_ns(lambda: callbacks.parse(data), args.number)
+        routed = per_call_ns(lambda: dispatch(data), args.number)
+        old = per_call_ns(lambda: legacy_chain(legacy), args.number)
+        print(f"{name:<12}{parse:>8.0f}ns{routed:>9.0f}ns{old:>8.0f}ns  {len(data.encode())}/{len(legacy.encode())}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Time the history and leaderboard queries before and after the index migration.
+
+Builds a throwaway database at the baseline schema, fills it with synthetic
+users, score_history and quizzes rows, times each query, then applies the
+remaining migrations and times them again.
+
+    python -m benchmarks.bench_history_queries --history-rows 10000000
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from src.database.migrations import run_migrations
+
+QUERIES = {
+    'score_history': ("""
+        SELECT score, timestamp FROM score_history
+        WHERE user_id = ? ORDER BY timestamp DESC LIMIT 10
+    """, True),
+    'my_quizzes': ("""
+        SELECT question, answer, quiz_type, created_at FROM quizzes
+        WHERE user_id = ? ORDER BY created_at DESC LIMIT 5
+    """, True),
+    'leaderboard': ("""
+        SELECT username, score FROM users ORDER BY score DESC LIMIT 10
+    """, False),
+}
+
+def populate(conn, users, history_rows, quiz_rows):
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (id, username, score, last_interaction)
+        SELECT i, 'user' || i, abs(random()) % 10000, datetime('now', '-' || (i % 1000) || ' minutes') FROM n
+    """, (users,))
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO score_history (user_id, score, timestamp)
+        SELECT 1 + abs(random()) % ?, i % 1000, datetime('now', '-' || (i % 500000) || ' minutes') FROM n
+    """, (history_rows, users))
+    conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO quizzes (user_id, question, answer, quiz_type, difficulty, created_at)
+        SELECT 1 + abs(random()) % ?, 'Question ' || i, 'Answer', 'General', 'easy',
+               datetime('now', '-' || (i % 500000) || ' minutes') FROM n
+    """, (quiz_rows, users))
+    conn.commit()
+
+def time_queries(conn, users, repeats):
+    results = {}
+    for name, (sql, per_user) in QUERIES.items():
+        timings = []
+        for i in range(repeats):
+            params = (1 + (i * 7919) % users,) if per_user else ()
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(timings)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--history-rows', type=int, default=10000000)
+    parser.add_argument('--quiz-rows', type=int, default=1000000)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        run_migrations(conn, target=1)
+
+        start = time.perf_counter()
+        populate(conn, args.users, args.history_rows, args.quiz_rows)
+        print(f"Inserted {args.users} users, {args.history_rows} history rows and "
+              f"{args.quiz_rows} quizzes in {time.perf_counter() - start:.1f}s")
+
+        before = time_queries(conn, args.users, args.repeats)
+        start = time.perf_counter()
+        version = run_migrations(conn)
+        print(f"Migrated to version {version} in {time.perf_counter() - start:.1f}s")
+        after = time_queries(conn, args.users, args.repeats)
+
+        print(f"{'query':<16}{'before (ms)':>14}{'after (ms)':>14}")
+        for name in QUERIES:
+            print(f"{name:<16}{before[name]:>14.3f}{after[name]:>14.3f}")
+        conn.close()
+
+if __name__ == '__main__':
+    main()
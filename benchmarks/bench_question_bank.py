@@ -0,0 +1,92 @@
+"""
+Benchmark for the local question bank: bulk import and offline serving.
+
+Writes a synthetic opentdb dump, imports it into a throwaway database,
+reporting throughput and peak memory of the import, then times serving
+random questions from LocalQuestionSource, per difficulty and overall.
+
+    python -m benchmarks.bench_question_bank --questions 100000 --serve 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('ADMIN_ID', '1')
+
+from src.api.question_source import LocalQuestionSource
+from src.database import aio
+from src.database.connection import close_connections
+from src.database.database import setup_db
+from src.database.question_import import import_dump
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+CATEGORIES = [f'Category {n}' for n in range(20)]
+
+def write_dump(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"response_code": 0, "results": [\n')
+        for n in range(count):
+            result = {
+                'type': 'multiple',
+                'difficulty': random.choice(DIFFICULTIES),
+                'category': random.choice(CATEGORIES),
+                'question': f'Synthetic question number {n} &amp; friends?',
+                'correct_answer': f'Answer {n}',
+                'incorrect_answers': [f'Wrong {n}.{k}' for k in range(3)],
+            }
+            f.write(('' if n == 0 else ',\n') + json.dumps(result))
+        f.write('\n]}\n')
+
+async def serve(source, count, difficulty=None, category=None):
+    start = time.perf_counter()
+    for _ in range(count):
+        question = await source.get(difficulty, category)
+        assert question is not None
+    return (time.perf_counter() - start) / count * 1e6
+
+async def run_serving(args):
+    source = LocalQuestionSource()
+    start = time.perf_counter()
+    await source.load()
+    print(f"index load: {source.size()} questions in {time.perf_counter() - start:.2f}s")
+    print(f"serve any: {await serve(source, args.serve):.0f} us/question")
+    for difficulty in DIFFICULTIES:
+        print(f"serve {difficulty}: {await serve(source, args.serve, difficulty):.0f} us/question")
+    print(f"serve hard + category: {await serve(source, args.serve, 'hard', CATEGORIES[0]):.0f} us/question")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--serve', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        setup_db()
+        dump = os.path.join(tmp, 'dump.json')
+        write_dump(dump, args.questions)
+        size = os.path.getsize(dump) / 1e6
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        counts = import_dump(dump)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"import: {counts['inserted']} questions from {size:.1f} MB in {elapsed:.2f}s "
+              f"({counts['inserted'] / elapsed:.0f}/s), peak {peak:.1f} MB traced")
+        counts = import_dump(dump)
+        print(f"reimport: {counts['inserted']} new of {counts['read']}")
+
+        asyncio.run(run_serving(args))
+        aio.shutdown()
+        close_connections()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure webhook ingest throughput without a Telegram connection.
+
+Starts the webhook server in front of an uninitialised application, POSTs
+synthetic /start and answer-button updates to it from concurrent clients,
+and drains the update queue, so the numbers cover HTTP handling, secret
+checking, JSON decoding and queueing but not the handlers themselves.
+
+    python -m benchmarks.bench_webhook --updates 20000 --concurrency 100
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import aiohttp
+from telegram.ext import Application
+
+from src.core.webhook import SECRET_HEADER, WebhookServer
+
+SECRET = 'bench-secret'
+
+def synthetic_update(update_id, user_id):
+    """A private-chat /start message or an answer-button callback from user_id."""
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'User', 'username': f'user{user_id}'}
+    chat = {'id': user_id, 'type': 'private'}
+    if update_id % 2:
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': chat,
+                'from': user,
+                'text': '/start',
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+            },
+        }
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': user,
+            'chat_instance': str(user_id),
+            'data': f'quiz_{random.randrange(4)}',
+            'message': {'message_id': update_id - 1, 'date': int(time.time()), 'chat': chat, 'text': 'Q?'},
+        },
+    }
+
+async def drain(queue, counter):
+    while True:
+        await queue.get()
+        counter[0] += 1
+
+async def post_updates(url, updates, concurrency, secret):
+    latencies, statuses = [], {}
+    limit = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def post(update):
+            async with limit:
+                start = time.perf_counter()
+                async with session.post(url, json=update, headers={SECRET_HEADER: secret}) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        await asyncio.gather(*(post(update) for update in updates))
+    return latencies, statuses
+
+async def main(args):
+    application = Application.builder().token('123456:BENCHMARK').build()
+    server = WebhookServer(application, secret_token=SECRET, host='127.0.0.1', port=args.port,
+                           max_connections=args.max_connections)
+    await server.start()
+    counter = [0]
+    drainer = asyncio.create_task(drain(application.update_queue, counter))
+    base = f'http://127.0.0.1:{args.port}'
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'{base}/healthz') as response:
+                print(f"healthz: {response.status}")
+            async with session.post(f'{base}{server.path}', json={}, headers={SECRET_HEADER: 'wrong'}) as response:
+                print(f"wrong secret: {response.status}")
+
+        updates = [synthetic_update(i, random.randrange(1, args.users + 1)) for i in range(1, args.updates + 1)]
+        start = time.perf_counter()
+        latencies, statuses = await post_updates(f'{base}{server.path}', updates, args.concurrency, SECRET)
+        elapsed = time.perf_counter() - start
+        while counter[0] < statuses.get(200, 0):
+            await asyncio.sleep(0.01)
+
+        latencies.sort()
+        print(f"{args.updates} updates in {elapsed:.2f}s: {args.updates / elapsed:.0f} updates/s")
+        print(f"statuses: {statuses}, queued and drained: {counter[0]}")
+        print(f"latency ms: p50 {statistics.median(latencies) * 1000:.2f}, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}, max {latencies[-1] * 1000:.2f}")
+        print(f"server metrics: {server.metrics()}")
+    finally:
+        await server.stop()
+        drainer.cancel()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--max-connections', type=int, default=40)
+    parser.add_argument('--port', type=int, default=8787)
+    asyncio.run(main(parser.parse_args()))
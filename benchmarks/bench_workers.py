@@ -0,0 +1,186 @@
+"""
+Load test for worker mode: how update throughput scales with worker count.
+
+For each worker count, spawns that many worker processes running the real
+handlers on a throwaway database, shards a synthetic update stream across
+them with the same hash the router uses, and measures how long the
+workers take to get through it. Each simulated user sends /start, picks a
+difficulty and answers the question, a few times over. Telegram is
+replaced by an offline request object that only answers getMe, and
+outgoing messages are counted instead of sent, so the numbers cover
+update decoding, handlers, quiz state and database work.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --users 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault('BOT_TOKEN', '123456:BENCHMARK')
+os.environ.setdefault('ADMIN_ID', '1')
+
+import multiprocessing
+
+from telegram.ext import Application
+from telegram.request import BaseRequest
+
+from src.api.quiz_api import question_id
+from src.core.outbound import INTERACTIVE
+from src.core.workers import serve_shard, shard_for
+from src.database import aio
+from src.database.connection import close_connections
+from src.database.database import setup_db
+from src.database.state import SeenQuestions, create_state_backend
+from src.handlers import callbacks
+from src.handlers.handlers import cancel_pending_quizzes, setup_handlers
+
+BOT_USER = {
+    'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot',
+    'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False,
+}
+
+class OfflineRequest(BaseRequest):
+    """Answers getMe so the application can initialize without Telegram."""
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        result = BOT_USER if url.endswith('/getMe') else True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+class CountingOutbound:
+    """Stands in for the outbound queue and drops every message."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, chat_id, call, priority=INTERACTIVE):
+        self.sent += 1
+
+def question_text(difficulty):
+    return f'A {difficulty} question?'
+
+class LocalPool:
+    """Question pool serving one fixed question per difficulty without the trivia API."""
+
+    async def get(self, difficulty=None, category=None, seen=None):
+        text = question_text(difficulty)
+        return {'id': question_id(text), 'question': text, 'answer': 'right',
+                'options': ['right', 'wrong 1', 'wrong 2', 'wrong 3'], 'quiz_type': 'General',
+                'difficulty': difficulty}
+
+    async def localize(self, question, lang):
+        return question
+
+async def post_init(application):
+    application.bot_data['write_behind_task'] = asyncio.create_task(aio.write_behind_loop())
+
+async def post_shutdown(application):
+    cancel_pending_quizzes(application)
+    application.bot_data['write_behind_task'].cancel()
+    await aio.flush_writes()
+
+def bench_worker(index, backend, queue, results):
+    application = (
+        Application.builder()
+        .token(os.environ['BOT_TOKEN'])
+        .request(OfflineRequest())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    outbound = CountingOutbound()
+    application.bot_data.update(
+        question_source=LocalPool(), outbound=outbound, state=create_state_backend(backend),
+        seen_questions=SeenQuestions()
+    )
+    setup_handlers(application)
+    results.put(('ready', index))
+    asyncio.run(serve_shard(application, queue, refresh_interval=3600))
+    aio.shutdown()
+    close_connections()
+    results.put(('done', index, time.perf_counter(), outbound.sent))
+
+def user_updates(user_id, rounds, next_id):
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'User', 'username': f'user{user_id}'}
+    chat = {'id': user_id, 'type': 'private'}
+    message = {'message_id': 1, 'date': int(time.time()), 'chat': chat, 'text': 'Q?'}
+
+    def callback(data):
+        return {'update_id': next(next_id), 'callback_query': {
+            'id': str(user_id), 'from': user, 'chat_instance': str(user_id), 'data': data, 'message': message,
+        }}
+
+    yield {'update_id': next(next_id), 'message': dict(
+        message, **{'from': user, 'text': '/start', 'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}]}
+    )}
+    for _ in range(rounds):
+        difficulty = random.choice(['easy', 'medium', 'hard'])
+        yield callback(callbacks.encode_difficulty(difficulty))
+        yield callback(callbacks.encode_answer(question_id(question_text(difficulty)), random.randrange(4)))
+
+def run(workers, args):
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [
+        context.Process(target=bench_worker, args=(index, args.backend, queue, results))
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        results.get()
+
+    next_id = iter(range(1, 1 << 62))
+    total = 0
+    start = time.perf_counter()
+    for user_id in range(1, args.users + 1):
+        queue = queues[shard_for(user_id, workers)]
+        for update in user_updates(user_id, args.rounds, next_id):
+            queue.put(update)
+            total += 1
+    for queue in queues:
+        queue.put(None)
+    finished = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = max(done[2] for done in finished) - start
+    sent = sum(done[3] for done in finished)
+    return total, elapsed, sent
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='sqlite')
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            # The workers inherit the working directory, so they all open this database
+            os.chdir(tmp)
+            setup_db()
+            close_connections()
+            total, elapsed, sent = run(workers, args)
+        baseline = baseline or total / elapsed
+        print(f"{workers} worker(s): {total} updates in {elapsed:.2f}s, {total / elapsed:.0f} updates/s "
+              f"({total / elapsed / baseline:.2f}x), {sent} messages")
+
+if __name__ == '__main__':
+    main()
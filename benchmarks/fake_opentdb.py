@@ -0,0 +1,171 @@
+"""
+Local stand-in for the Open Trivia Database, for exercising the API client offline.
+
+Serves ``/api.php`` and ``/api_token.php`` with opentdb's response codes:
+generated questions, session tokens that run dry (code 4) once they have
+handed out every question, and optionally the one-request-per-5-seconds
+per IP limit (code 5). Latency, a failure rate and a full outage can be
+injected, and changed while the server runs, to see how the bot copes.
+
+    python -m benchmarks.fake_opentdb --port 8081 --delay 0.2 --fail-rate 0.1
+    QUIZ_API_URL=http://127.0.0.1:8081/api.php python -m src.core.bot
+"""
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from typing import Dict, Optional, Set
+
+from aiohttp import web
+
+from src.api.quiz_api import SUCCESS, NO_RESULTS, INVALID_PARAMETER, TOKEN_NOT_FOUND, TOKEN_EMPTY, RATE_LIMIT
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+def make_question(index: int) -> Dict:
+    return {
+        'type': 'multiple',
+        'difficulty': DIFFICULTIES[index % len(DIFFICULTIES)],
+        'category': f"Category {index % 24 + 9}",
+        'question': f"Generated question {index} &amp; friends?",
+        'correct_answer': f"Right {index}",
+        'incorrect_answers': [f"Wrong {index}.{n}" for n in range(3)],
+    }
+
+class FakeOpenTDB:
+    """The fake server and the knobs it is driven with.
+
+    ``delay`` seconds are added to every api.php response, ``fail_rate`` of
+    them are answered with HTTP 500, and while ``down`` is set every request
+    hangs until the client gives up. With ``rate_limit`` set, a second
+    request from the same address within ``min_interval`` seconds gets code 5.
+    """
+
+    def __init__(self, questions: int = 500, delay: float = 0.0, fail_rate: float = 0.0,
+                 rate_limit: bool = False, min_interval: float = 5.0,
+                 host: str = '127.0.0.1', port: int = 8081):
+        self.questions = [make_question(index) for index in range(questions)]
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.down = False
+        self.rate_limit = rate_limit
+        self.min_interval = min_interval
+        self.host = host
+        self.port = port
+        self.tokens: Dict[str, Set[int]] = {}
+        self.metrics = {'requests': 0, 'failed': 0, 'rate_limited': 0, 'token_empty': 0}
+        self._last_request: Dict[str, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api.php"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/api.php', self._api)
+        app.router.add_get('/api_token.php', self._token)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _hang_if_down(self):
+        while self.down:
+            await asyncio.sleep(0.05)
+
+    async def _token(self, request: web.Request) -> web.Response:
+        await self._hang_if_down()
+        command = request.query.get('command')
+        if command == 'request':
+            token = secrets.token_hex(32)
+            self.tokens[token] = set()
+            return web.json_response({'response_code': SUCCESS, 'token': token})
+        token = request.query.get('token')
+        if command == 'reset' and token in self.tokens:
+            self.tokens[token].clear()
+            return web.json_response({'response_code': SUCCESS, 'token': token})
+        return web.json_response({'response_code': TOKEN_NOT_FOUND})
+
+    async def _api(self, request: web.Request) -> web.Response:
+        self.metrics['requests'] += 1
+        await self._hang_if_down()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self.metrics['failed'] += 1
+            raise web.HTTPInternalServerError()
+
+        if self.rate_limit:
+            now = time.monotonic()
+            last = self._last_request.get(request.remote, float('-inf'))
+            self._last_request[request.remote] = now
+            if now - last < self.min_interval:
+                self.metrics['rate_limited'] += 1
+                return web.json_response({'response_code': RATE_LIMIT, 'results': []})
+
+        try:
+            amount = int(request.query.get('amount', '10'))
+        except ValueError:
+            amount = 0
+        if not 1 <= amount <= 50:
+            return web.json_response({'response_code': INVALID_PARAMETER, 'results': []})
+
+        difficulty = request.query.get('difficulty')
+        candidates = [
+            index for index, question in enumerate(self.questions)
+            if not difficulty or question['difficulty'] == difficulty
+        ]
+        token = request.query.get('token')
+        if token is not None:
+            if token not in self.tokens:
+                return web.json_response({'response_code': TOKEN_NOT_FOUND, 'results': []})
+            served = self.tokens[token]
+            candidates = [index for index in candidates if index not in served]
+            if len(candidates) < amount:
+                self.metrics['token_empty'] += 1
+                return web.json_response({'response_code': TOKEN_EMPTY, 'results': []})
+        if len(candidates) < amount:
+            return web.json_response({'response_code': NO_RESULTS, 'results': []})
+
+        picked = random.sample(candidates, amount)
+        if token is not None:
+            self.tokens[token].update(picked)
+        return web.json_response({
+            'response_code': SUCCESS,
+            'results': [self.questions[index] for index in picked],
+        })
+
+async def serve(server: FakeOpenTDB):
+    await server.start()
+    print(f"Fake opentdb serving {len(server.questions)} questions at {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', action='store_true')
+    args = parser.parse_args()
+    server = FakeOpenTDB(
+        questions=args.questions, delay=args.delay, fail_rate=args.fail_rate,
+        rate_limit=args.rate_limit, host=args.host, port=args.port
+    )
+    try:
+        asyncio.run(serve(server))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
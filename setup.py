@@ -4,6 +4,7 @@ setup(
     name="quiz_bot",
     version="0.1",
     packages=find_packages(),
+    package_data={'src': ['locale/*.json']},
     install_requires=[
         "python-telegram-bot>=20.0",
         "deep-translator>=1.10.0",
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Container, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.api.quiz_api import QuizAPI, format_question
+from src.utils.utils import translate_batch_async
+
+PoolKey = Tuple[Optional[str], Optional[str]]
+
+async def localize_question(question: Dict, lang: str) -> Dict:
+    """Return the question and options in ``lang``, translating and caching them on the question if needed.
+
+    Texts the translator failed on are shown in English, and the result is
+    only cached on the question if everything was translated.
+    """
+    if lang == 'en':
+        return {'question': question['question'], 'options': question['options']}
+    translations = question.setdefault('translations', {})
+    localized = translations.get(lang)
+    if localized is None:
+        originals = [question['question'], *question['options']]
+        texts = await translate_batch_async(originals, lang)
+        localized = {
+            'question': texts[0] or originals[0],
+            'options': [text or original for text, original in zip(texts[1:], originals[1:])],
+        }
+        if None not in texts:
+            translations[lang] = localized
+    return localized
+
+class QuestionPool:
+    """Prefetched questions kept in memory per (difficulty, category).
+
+    Questions are served from the in-memory deque. Whenever a deque drops
+    below ``low_watermark`` a background task pulls batches of
+    ``batch_size`` questions until it reaches ``high_watermark``. The
+    API client spaces the fetches to stay within opentdb's rate limit.
+
+    The last ``high_watermark`` questions served per key are remembered.
+    If the API has nothing to give (it is down, or its circuit breaker is
+    open) and the pool is empty, one of them is served again rather than
+    nothing, preferring ones the user has not seen.
+
+    Pooled questions are formatted dicts (see ``format_question``) with an
+    extra ``translations`` mapping of language code to the localized
+    question and options. Every language in ``languages`` is translated in
+    the background right after a batch arrives, so serving a question does
+    not wait on the translator.
+
+    If a ``bank`` (see ``LocalQuestionSource``) is given, every fetched
+    batch is also added to it and the questions take their bank ids.
+    """
+
+    def __init__(self, quiz_api: QuizAPI, batch_size: int = 50, low_watermark: int = 10,
+                 high_watermark: int = 100, languages: Iterable[str] = (), bank=None):
+        self.quiz_api = quiz_api
+        self.bank = bank
+        self.languages = [lang for lang in languages if lang != 'en']
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self._pools: Dict[PoolKey, Deque[Dict]] = {}
+        self._recent: Dict[PoolKey, Deque[Dict]] = {}
+        self._refills: Dict[PoolKey, asyncio.Task] = {}
+        # Set whenever a batch lands in the pool, so waiters need not sit out the whole refill
+        self._arrivals: Dict[PoolKey, asyncio.Event] = {}
+        self._localizers = set()
+
+    def size(self, difficulty: Optional[str] = None, category: Optional[str] = None) -> int:
+        """Number of questions currently buffered for a key."""
+        return len(self._pools.get((difficulty, category), ()))
+
+    async def get(self, difficulty: Optional[str] = None, category: Optional[str] = None,
+                  seen: Optional[Container[int]] = None) -> Optional[Dict]:
+        """Take one formatted question for the key, waiting for the next batch only if the pool is empty.
+
+        Questions whose id is in ``seen`` are skipped. If every buffered
+        question has been seen, the oldest one is served anyway rather than
+        failing. If no batch arrives, a recently served question is repeated.
+        """
+        key = (difficulty, category)
+        pool = self._pools.setdefault(key, deque())
+        if not pool:
+            arrival = self._arrivals.setdefault(key, asyncio.Event())
+            arrival.clear()
+            refill = self._schedule_refill(key)
+            waiter = asyncio.ensure_future(arrival.wait())
+            try:
+                await asyncio.wait({refill, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+        question = self.get_nowait(difficulty, category, seen)
+        if question is None and seen is not None:
+            question = self.get_nowait(difficulty, category)
+        if question is None:
+            question = self._repeat(key, seen)
+        return question
+
+    def get_nowait(self, difficulty: Optional[str] = None, category: Optional[str] = None,
+                   seen: Optional[Container[int]] = None) -> Optional[Dict]:
+        """Take one question not in ``seen`` if the pool has any, otherwise return None.
+
+        A refill is started whenever the pool runs low.
+        """
+        key = (difficulty, category)
+        pool = self._pools.setdefault(key, deque())
+        question = None
+        if seen is None:
+            if pool:
+                question = pool.popleft()
+        else:
+            for index, candidate in enumerate(pool):
+                if candidate['id'] not in seen:
+                    question = candidate
+                    del pool[index]
+                    break
+        if question is not None:
+            self._recent.setdefault(key, deque(maxlen=self.high_watermark)).append(question)
+        if len(pool) < self.low_watermark:
+            self._schedule_refill(key)
+        return question
+
+    def _repeat(self, key: PoolKey, seen: Optional[Container[int]] = None) -> Optional[Dict]:
+        # Repeats go to the back, so a long outage cycles through them all
+        recent = self._recent.get(key)
+        if not recent:
+            return None
+        index = 0
+        if seen is not None:
+            index = next((i for i, question in enumerate(recent) if question['id'] not in seen), 0)
+        question = recent[index]
+        del recent[index]
+        recent.append(question)
+        return question
+
+    async def warm(self, *keys: PoolKey):
+        """Fill the given keys up to the high watermark."""
+        await asyncio.gather(*(self._schedule_refill(key) for key in keys))
+
+    def _schedule_refill(self, key: PoolKey) -> asyncio.Task:
+        task = self._refills.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refill(key))
+            self._refills[key] = task
+        return task
+
+    async def _refill(self, key: PoolKey):
+        pool = self._pools.setdefault(key, deque())
+        difficulty, category = key
+        params = {'amount': self.batch_size, 'type': 'multiple'}
+        if difficulty:
+            params['difficulty'] = difficulty
+        if category:
+            params['category'] = category
+
+        while len(pool) < self.high_watermark:
+            results = await self.quiz_api.get_questions(params)
+            if not results:
+                break
+            questions = [format_question(result) for result in results]
+            for question in questions:
+                question['translations'] = {}
+            if self.bank is not None:
+                try:
+                    await self.bank.add_questions(questions)
+                except Exception as e:
+                    logging.error(f"Error adding fetched questions to the bank: {e}")
+            pool.extend(questions)
+            logging.info(f"Question pool {key} refilled to {len(pool)}")
+            self._arrivals.setdefault(key, asyncio.Event()).set()
+            if self.languages:
+                task = asyncio.create_task(self._localize_batch(questions))
+                self._localizers.add(task)
+                task.add_done_callback(self._localizers.discard)
+
+    async def localize(self, question: Dict, lang: str) -> Dict:
+        """Return the question and options in ``lang``, translating them now if prefetch has not."""
+        return await localize_question(question, lang)
+
+    async def _localize_batch(self, questions: List[Dict]):
+        texts = [text for q in questions for text in (q['question'], *q['options'])]
+        for lang in self.languages:
+            translated = await translate_batch_async(texts, lang, timeout=None)
+            position = 0
+            for question in questions:
+                width = 1 + len(question['options'])
+                chunk = translated[position:position + width]
+                position += width
+                # Leave partly translated questions for localize_question to retry
+                if None not in chunk:
+                    question['translations'].setdefault(lang, {'question': chunk[0], 'options': chunk[1:]})
+
+    async def close(self):
+        """Cancel pending refills. The shared API client is closed by its owner."""
+        tasks = [*self._refills.values(), *self._localizers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refills.clear()
@@ -0,0 +1,170 @@
+"""
+Where quiz questions come from.
+
+Every source has the same interface as QuestionPool: ``get(difficulty,
+category, seen)`` returns a formatted question or None, preferring ones
+whose id is not in ``seen``, ``localize(question, lang)`` translates it,
+and ``warm(*keys)`` / ``close()`` bracket its lifetime.
+
+- "api": QuestionPool, prefetching from opentdb.
+- "local": LocalQuestionSource, the question_bank table only. Works offline.
+- "hybrid": the pool first, falling back to the bank whenever the pool has
+  nothing ready, e.g. during an outage or while rate limited. Fetched
+  questions are added to the bank, so it grows as the bot runs.
+"""
+import json
+import logging
+import random
+from array import array
+from typing import Container, Dict, Iterable, List, Optional
+
+from src.api.question_pool import PoolKey, QuestionPool, localize_question
+from src.database import aio
+
+# Random picks tried before scanning for an unseen question, and how many
+# ids that scan checks before giving up and repeating a question
+SAMPLE_ATTEMPTS = 8
+SCAN_LIMIT = 4096
+
+def format_bank_question(row) -> Dict:
+    """Turn a question_bank row into a formatted question with shuffled options."""
+    question_id, question, answer, incorrect_answers, category, difficulty = row
+    options = [*json.loads(incorrect_answers), answer]
+    random.shuffle(options)
+    return {
+        'id': question_id,
+        'question': question,
+        'answer': answer,
+        'options': options,
+        'quiz_type': category,
+        'difficulty': difficulty,
+        'translations': {},
+    }
+
+class LocalQuestionSource:
+    """Random questions from the question_bank table.
+
+    The ids of all banked questions are held in compact integer arrays per
+    (difficulty, category), (difficulty, None), (None, category) and
+    (None, None), so a random pick is an array index plus one primary key
+    lookup rather than ``ORDER BY RANDOM()`` over the table.
+    """
+
+    def __init__(self):
+        self._ids: Dict[PoolKey, array] = {}
+        self._max_id = 0
+
+    def size(self, difficulty: Optional[str] = None, category: Optional[str] = None) -> int:
+        return len(self._ids.get((difficulty, category), ()))
+
+    def _index(self, question_id: int, difficulty: Optional[str], category: Optional[str]):
+        for key in ((difficulty, category), (difficulty, None), (None, category), (None, None)):
+            ids = self._ids.get(key)
+            if ids is None:
+                ids = self._ids[key] = array('q')
+            ids.append(question_id)
+        self._max_id = max(self._max_id, question_id)
+
+    async def load(self):
+        """(Re)build the id arrays from the table."""
+        self._ids = {}
+        self._max_id = 0
+        rows = await aio.get_question_bank_index()
+        for question_id, difficulty, category in rows:
+            self._index(question_id, difficulty, category)
+        logging.info(f"Question bank loaded with {len(rows)} questions")
+
+    def sample(self, difficulty: Optional[str] = None, category: Optional[str] = None,
+               seen: Optional[Container[int]] = None) -> Optional[int]:
+        """Pick a random banked id for the key that is not in ``seen``, or None if none was found."""
+        ids = self._ids.get((difficulty, category))
+        if not ids:
+            return None
+        if seen is None:
+            return ids[random.randrange(len(ids))]
+        for _ in range(SAMPLE_ATTEMPTS):
+            question_id = ids[random.randrange(len(ids))]
+            if question_id not in seen:
+                return question_id
+        # Mostly seen: walk the ids from a random point instead of guessing
+        start = random.randrange(len(ids))
+        for offset in range(min(len(ids), SCAN_LIMIT)):
+            question_id = ids[(start + offset) % len(ids)]
+            if question_id not in seen:
+                return question_id
+        return None
+
+    async def fetch(self, question_id: Optional[int]) -> Optional[Dict]:
+        if question_id is None:
+            return None
+        row = await aio.get_bank_question(question_id)
+        return format_bank_question(row) if row else None
+
+    async def get(self, difficulty: Optional[str] = None, category: Optional[str] = None,
+                  seen: Optional[Container[int]] = None) -> Optional[Dict]:
+        """A random question for the key, repeating a seen one once the user has seen them all."""
+        question_id = self.sample(difficulty, category, seen)
+        if question_id is None and seen is not None:
+            question_id = self.sample(difficulty, category)
+        return await self.fetch(question_id)
+
+    async def add_questions(self, questions: List[Dict]):
+        """Bank formatted questions, giving each its bank id. Duplicates keep their existing id."""
+        ids = await aio.add_bank_questions(questions)
+        # New rows always get ids above every indexed one; comparing with the
+        # running maximum also skips a question repeated within the batch
+        for question, question_id in zip(questions, ids):
+            question['id'] = question_id
+            if question_id > self._max_id:
+                self._index(question_id, question.get('difficulty'), question.get('quiz_type'))
+
+    async def localize(self, question: Dict, lang: str) -> Dict:
+        return await localize_question(question, lang)
+
+    async def warm(self, *keys: PoolKey):
+        await self.load()
+
+    async def close(self):
+        pass
+
+class HybridQuestionSource:
+    """The API pool with the local bank as a fallback."""
+
+    def __init__(self, pool: QuestionPool, bank: LocalQuestionSource):
+        self.pool = pool
+        self.bank = bank
+
+    async def get(self, difficulty: Optional[str] = None, category: Optional[str] = None,
+                  seen: Optional[Container[int]] = None) -> Optional[Dict]:
+        question = self.pool.get_nowait(difficulty, category, seen)
+        if question is None:
+            question = await self.bank.fetch(self.bank.sample(difficulty, category, seen))
+        if question is None:
+            # Nothing unseen banked for this key either; wait for the API,
+            # which repeats a question only as a last resort
+            question = await self.pool.get(difficulty, category, seen)
+        if question is None:
+            question = await self.bank.get(difficulty, category)
+        return question
+
+    async def localize(self, question: Dict, lang: str) -> Dict:
+        return await localize_question(question, lang)
+
+    async def warm(self, *keys: PoolKey):
+        await self.bank.load()
+        await self.pool.warm(*keys)
+
+    async def close(self):
+        await self.pool.close()
+
+def create_question_source(kind: str, quiz_api, languages: Iterable[str] = (), **pool_options):
+    """Create the "api", "local" or "hybrid" question source."""
+    if kind == 'local':
+        return LocalQuestionSource()
+    if kind == 'api':
+        return QuestionPool(quiz_api, languages=languages, **pool_options)
+    if kind == 'hybrid':
+        bank = LocalQuestionSource()
+        pool = QuestionPool(quiz_api, languages=languages, bank=bank, **pool_options)
+        return HybridQuestionSource(pool, bank)
+    raise ValueError(f"Unknown question source: {kind}")
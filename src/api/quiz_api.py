@@ -1,19 +1,45 @@
 import aiohttp
+import asyncio
 import logging
 import random
-from typing import Dict, Optional
+import time
+from typing import Dict, List, Optional
 import html
+import zlib
+from src.utils.circuit_breaker import CircuitBreaker
+
+OPENTDB_URL = "https://opentdb.com/api.php"
+
+# opentdb response_code values
+SUCCESS = 0
+NO_RESULTS = 1
+INVALID_PARAMETER = 2
+TOKEN_NOT_FOUND = 3
+TOKEN_EMPTY = 4
+RATE_LIMIT = 5
+
+class OpenTDBError(Exception):
+    """A response with a non-zero response_code."""
+
+    def __init__(self, code: int):
+        super().__init__(f"opentdb response_code {code}")
+        self.code = code
+
+def question_id(text: str) -> int:
+    """Stable 32-bit id for a question, the same in every process."""
+    return zlib.crc32(text.encode('utf-8'))
 
 def format_question(question_data: Dict) -> Dict:
     """Format the question data for use in the bot."""
     question = html.unescape(question_data['question'])
     correct_answer = html.unescape(question_data['correct_answer'])
     incorrect_answers = [html.unescape(ans) for ans in question_data['incorrect_answers']]
-    
+
     options = [*incorrect_answers, correct_answer]
     random.shuffle(options)
 
     return {
+        'id': question_id(question),
         'question': question,
         'answer': correct_answer,
         'options': options,
@@ -22,42 +48,221 @@ def format_question(question_data: Dict) -> Dict:
     }
 
 class QuizAPI:
-    def __init__(self):
-        self.base_url = "https://opentdb.com/api.php"
+    """Long-lived client for the Open Trivia Database.
+
+    One instance is created per application and shared by all handlers so
+    connections, DNS lookups and TLS sessions are reused between requests.
+
+    Requests are spaced ``min_interval`` seconds apart, as opentdb allows
+    one request per 5 seconds per IP, and carry a session token so a batch
+    never repeats questions the bot already got; an exhausted token is
+    reset. Token requests are spaced and retried like question requests.
+    Timeouts, connection errors and server errors are retried up to
+    ``max_retries`` times with jittered backoff and count towards a circuit
+    breaker. An HTTP 429 is backed off like opentdb's rate limit code, and
+    any other 4xx is given up on without a retry. While the breaker is
+    open, ``get_questions`` returns no questions without touching the
+    network, so callers fall back to what they have cached or banked
+    straight away.
+    """
+
+    def __init__(self, pool_size: int = 10, keepalive_timeout: float = 60.0,
+                 dns_cache_ttl: int = 300, connect_timeout: float = 5.0,
+                 request_timeout: float = 10.0, read_timeout: float = 5.0,
+                 base_url: str = OPENTDB_URL, min_interval: float = 5.0, max_retries: int = 2,
+                 use_token: bool = True, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url
+        self.token_url = base_url.rsplit('/', 1)[0] + '/api_token.php'
         self.session = None
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=request_timeout, connect=connect_timeout, sock_read=read_timeout
+        )
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.use_token = use_token
+        self.breaker = breaker or CircuitBreaker()
+        self._token: Optional[str] = None
+        self._token_empty = False
+        self._throttle_lock: Optional[asyncio.Lock] = None
+        self._last_request = float('-inf')
+        self._metrics = {
+            'requests': 0,
+            'in_flight': 0,
+            'queued': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'retries': 0,
+            'failures': 0,
+            'token_resets': 0,
+        }
 
     async def _ensure_session(self):
         if self.session is None:
-            self.session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()]
+            )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        metrics = self._metrics
+
+        async def on_queued_start(session, ctx, params):
+            metrics['queued'] += 1
+
+        async def on_queued_end(session, ctx, params):
+            metrics['queued'] -= 1
+
+        async def on_create_end(session, ctx, params):
+            metrics['connections_created'] += 1
+
+        async def on_reuse(session, ctx, params):
+            metrics['connections_reused'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def metrics(self) -> Dict:
+        """Snapshot of connection pool usage and upstream health."""
+        return dict(self._metrics, pool_size=self.pool_size, breaker=self.breaker.metrics())
+
+    async def get_questions(self, params: Optional[Dict] = None) -> List[Dict]:
+        """Fetch a batch of quiz questions from the Open Trivia Database.
+
+        Returns an empty list if there are none or the API is unavailable.
+        """
+        request_params = {
+            'amount': 1,
+            'type': 'multiple'
+        }
+        if params:
+            request_params.update(params)
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow_request():
+                return []
+            if attempt:
+                self._metrics['retries'] += 1
+            try:
+                results = await self._request(request_params)
+                self.breaker.record_success()
+                return results
+            except OpenTDBError as e:
+                # The API answered, so it is healthy even if it had nothing for us
+                self.breaker.record_success()
+                if e.code == TOKEN_EMPTY:
+                    # Reset on the next attempt, which the breaker has let through
+                    self._token_empty = True
+                elif e.code == TOKEN_NOT_FOUND:
+                    self._token = None
+                elif e.code == RATE_LIMIT:
+                    logging.warning("opentdb rate limit hit, backing off")
+                    await asyncio.sleep(self._backoff(attempt))
+                else:
+                    logging.error(f"API returned no results for {request_params}: {e}")
+                    return []
+            except aiohttp.ClientResponseError as e:
+                if e.status >= 500:
+                    await self._failed(attempt, e)
+                    continue
+                # The API is up but rejects the request, so asking again cannot help
+                self.breaker.record_success()
+                logging.error(f"API rejected {request_params}: HTTP {e.status} {e.message}")
+                return []
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+                await self._failed(attempt, e)
+        return []
+
+    async def _failed(self, attempt: int, error: Exception):
+        self._metrics['failures'] += 1
+        self.breaker.record_failure()
+        logging.error(f"Error fetching questions from API (attempt {attempt + 1}): {error!r}")
+        if attempt < self.max_retries:
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _backoff(self, attempt: int) -> float:
+        # The throttle already spaces requests min_interval apart; this spreads
+        # retries out further so a struggling upstream gets some room
+        return self.min_interval * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _throttle(self):
+        if self._throttle_lock is None:
+            self._throttle_lock = asyncio.Lock()
+        async with self._throttle_lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request = time.monotonic()
+
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        """Make one throttled request to opentdb, questions or token alike."""
+        await self._ensure_session()
+        await self._throttle()
+        self._metrics['requests'] += 1
+        self._metrics['in_flight'] += 1
+        try:
+            async with self.session.get(url, params=params) as response:
+                if response.status == 429:
+                    raise OpenTDBError(RATE_LIMIT)
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        finally:
+            self._metrics['in_flight'] -= 1
+
+    async def _request(self, params: Dict) -> List[Dict]:
+        # Token calls fail like the question request would, so the caller's
+        # breaker and retries cover them too
+        if self.use_token and self._token is None:
+            await self._request_token()
+        elif self._token_empty:
+            await self._reset_token()
+        if self._token is not None:
+            params = dict(params, token=self._token)
+        data = await self._get_json(self.base_url, params)
+        if data['response_code'] != SUCCESS:
+            raise OpenTDBError(data['response_code'])
+        return data['results']
+
+    async def _request_token(self):
+        data = await self._get_json(self.token_url, {'command': 'request'})
+        if data.get('response_code') == SUCCESS:
+            self._token = data['token']
+            self._token_empty = False
+        else:
+            # Carry on without a token; duplicates are better than no questions
+            logging.error(f"opentdb refused a session token: {data}")
+
+    async def _reset_token(self):
+        """Start the token over once it has handed out every question."""
+        self._metrics['token_resets'] += 1
+        data = await self._get_json(self.token_url, {'command': 'reset', 'token': self._token})
+        self._token_empty = False
+        if data.get('response_code') != SUCCESS:
+            logging.error(f"opentdb did not reset the session token: {data}")
+            self._token = None
 
     async def get_question(self, params: Optional[Dict] = None) -> Optional[Dict]:
         """Fetch a single quiz question from the Open Trivia Database."""
-        try:
-            await self._ensure_session()
-            default_params = {
-                'amount': 1,
-                'type': 'multiple'
-            }
-            if params:
-                default_params.update(params)
-            
-            async with self.session.get(self.base_url, params=default_params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data['response_code'] == 0 and data['results']:
-                        return data['results'][0]
-                    else:
-                        logging.error(f"API returned no results: {data}")
-                        return None
-                else:
-                    logging.error(f"API request failed with status {response.status}")
-                    return None
-        except Exception as e:
-            logging.error(f"Error fetching question from API: {e}")
-            return None
+        params = dict(params or {}, amount=1)
+        results = await self.get_questions(params)
+        return results[0] if results else None
 
     async def close(self):
         """Close the aiohttp session."""
         if self.session:
             await self.session.close()
-            self.session = None 
\ No newline at end of file
+            self.session = None
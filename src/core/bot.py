@@ -2,11 +2,72 @@
 
 from telegram.ext import Application
 from telegram import Update, BotCommand
-from src.core.constants import TOKEN
-from src.database.database import setup_db
-from src.handlers.handlers import setup_handlers
+from src.core.constants import (
+    TOKEN,
+    LANGUAGES,
+    QUESTION_POOL_BATCH_SIZE,
+    QUESTION_POOL_LOW_WATERMARK,
+    QUESTION_POOL_HIGH_WATERMARK,
+    QUESTION_SOURCE,
+    SEEN_SET_CAPACITY,
+    SEEN_SET_ERROR_RATE,
+    STATS_REFRESH_INTERVAL,
+    LEADERBOARD_SIZE,
+    RETENTION_SCORE_HISTORY_DAYS,
+    RETENTION_QUIZZES_DAYS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_INTERVAL,
+    QUIZ_API_POOL_SIZE,
+    QUIZ_API_CONNECT_TIMEOUT,
+    QUIZ_API_REQUEST_TIMEOUT,
+    QUIZ_API_READ_TIMEOUT,
+    QUIZ_API_URL,
+    QUIZ_API_MIN_INTERVAL,
+    QUIZ_API_MAX_RETRIES,
+    QUIZ_API_BREAKER_THRESHOLD,
+    QUIZ_API_BREAKER_RESET,
+    QUIZ_API_USE_TOKEN,
+    SCHEDULER_TICK,
+    SCHEDULER_JITTER,
+    SCHEDULER_WORKERS,
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_PER_CHAT_RATE,
+    OUTBOUND_PER_CHAT_BURST,
+    OUTBOUND_MAX_RETRIES,
+    OUTBOUND_MAX_IN_FLIGHT,
+    CONCURRENT_UPDATES,
+    RUN_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_DRAIN_TIMEOUT,
+    WORKERS,
+    WORKER_QUEUE_SIZE,
+    STATE_BACKEND,
+    ACTIVE_QUESTION_TTL,
+    ACTIVE_QUESTION_MAX
+)
+from src.api.quiz_api import QuizAPI
+from src.utils.circuit_breaker import CircuitBreaker
+from src.api.question_source import create_question_source
+from src.database.database import setup_db, load_leaderboard
+from src.database.connection import close_connections
+from src.database import aio
+from src.database.state import SeenQuestions, create_state_backend
+from src.database.retention import retention_loop
+from src.utils.utils import shutdown_translation_pool
+from src.handlers.handlers import setup_handlers, send_quiz, cancel_pending_quizzes
+from src.core.scheduler import QuizScheduler
+from src.core.stats import StatsSnapshot
+from src.core.outbound import OutboundQueue
+from src.core.webhook import WebhookServer, serve
+from src.core.workers import ShardRouter
 import asyncio
 import logging
+import secrets
 
 # Set up logging
 logging.basicConfig(
@@ -14,6 +75,105 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+async def post_init(application: Application):
+    """Start prefetching questions in the background."""
+    pool = application.bot_data['question_source']
+    application.create_task(pool.warm((None, None), ('easy', None), ('medium', None), ('hard', None)))
+    application.bot_data['write_behind_task'] = asyncio.create_task(aio.write_behind_loop())
+    application.bot_data['outbound'].start()
+    await application.bot_data['scheduler'].start()
+    await application.bot_data['stats'].start()
+    if application.bot_data['maintenance'] and RETENTION_INTERVAL:
+        application.bot_data['retention_task'] = asyncio.create_task(retention_loop(
+            RETENTION_INTERVAL, RETENTION_SCORE_HISTORY_DAYS, RETENTION_QUIZZES_DAYS, RETENTION_BATCH_SIZE
+        ))
+
+async def post_shutdown(application: Application):
+    """Release resources held by the application."""
+    await application.bot_data['scheduler'].stop()
+    await application.bot_data['stats'].stop()
+    cancel_pending_quizzes(application)
+    outbound = application.bot_data['outbound']
+    await outbound.stop()
+    logging.info(f"Outbound queue metrics: {outbound.metrics()}")
+    await application.bot_data['question_source'].close()
+    quiz_api = application.bot_data['quiz_api']
+    logging.info(f"Quiz API pool metrics: {quiz_api.metrics()}")
+    await quiz_api.close()
+    retention_task = application.bot_data.get('retention_task')
+    if retention_task is not None:
+        retention_task.cancel()
+    application.bot_data['write_behind_task'].cancel()
+    flushed = await aio.flush_writes()
+    logging.info(f"Flushed {flushed} buffered database writes")
+    shutdown_translation_pool()
+    aio.shutdown()
+    close_connections()
+
+def build_application(workers=1, owns=None, maintenance=True):
+    """Build the application with all shared objects and handlers.
+
+    With several workers each one gets an equal share of the outbound rate
+    limit and of the opentdb request budget, and only runs the schedules of
+    the users it owns, and only the one with ``maintenance`` set runs
+    database retention.
+    """
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if CONCURRENT_UPDATES:
+        builder = builder.concurrent_updates(CONCURRENT_UPDATES)
+    application = builder.build()
+    quiz_api = QuizAPI(
+        pool_size=QUIZ_API_POOL_SIZE,
+        connect_timeout=QUIZ_API_CONNECT_TIMEOUT,
+        request_timeout=QUIZ_API_REQUEST_TIMEOUT,
+        read_timeout=QUIZ_API_READ_TIMEOUT,
+        base_url=QUIZ_API_URL,
+        # Workers share one IP, and opentdb allows one request per interval per IP
+        min_interval=QUIZ_API_MIN_INTERVAL * workers,
+        max_retries=QUIZ_API_MAX_RETRIES,
+        use_token=QUIZ_API_USE_TOKEN,
+        breaker=CircuitBreaker(QUIZ_API_BREAKER_THRESHOLD, QUIZ_API_BREAKER_RESET)
+    )
+    application.bot_data['quiz_api'] = quiz_api
+    application.bot_data['maintenance'] = maintenance
+    application.bot_data['question_source'] = create_question_source(
+        QUESTION_SOURCE,
+        quiz_api,
+        batch_size=QUESTION_POOL_BATCH_SIZE,
+        low_watermark=QUESTION_POOL_LOW_WATERMARK,
+        high_watermark=QUESTION_POOL_HIGH_WATERMARK,
+        languages=LANGUAGES
+    )
+    application.bot_data['scheduler'] = QuizScheduler(
+        application,
+        send_quiz,
+        tick=SCHEDULER_TICK,
+        jitter=SCHEDULER_JITTER,
+        workers=SCHEDULER_WORKERS,
+        owns=owns
+    )
+    application.bot_data['outbound'] = OutboundQueue(
+        global_rate=OUTBOUND_GLOBAL_RATE / workers,
+        per_chat_rate=OUTBOUND_PER_CHAT_RATE,
+        per_chat_burst=OUTBOUND_PER_CHAT_BURST,
+        max_retries=OUTBOUND_MAX_RETRIES,
+        max_in_flight=OUTBOUND_MAX_IN_FLIGHT
+    )
+    application.bot_data['state'] = create_state_backend(
+        STATE_BACKEND, ttl=ACTIVE_QUESTION_TTL, max_size=ACTIVE_QUESTION_MAX
+    )
+    application.bot_data['stats'] = StatsSnapshot(interval=STATS_REFRESH_INTERVAL, top_n=LEADERBOARD_SIZE)
+    application.bot_data['seen_questions'] = SeenQuestions(
+        capacity=SEEN_SET_CAPACITY, error_rate=SEEN_SET_ERROR_RATE
+    )
+    setup_handlers(application)
+    return application
+
 def main():
     """Start the bot."""
     # Setup
@@ -22,8 +182,16 @@ def main():
     logging.info("Database setup complete")
     
     # Build application
-    application = Application.builder().token(TOKEN).build()
-    setup_handlers(application)
+    router = None
+    if WORKERS > 1:
+        # This process only receives updates and hands them to the workers
+        router = ShardRouter(WORKERS, queue_size=WORKER_QUEUE_SIZE)
+        application = Application.builder().token(TOKEN).build()
+        router.install(application)
+        router.start()
+    else:
+        load_leaderboard()
+        application = build_application()
     logging.info("Handlers setup complete")
     
     # Set up commands menu
@@ -31,8 +199,10 @@ def main():
         BotCommand("start", "Initialize or reset your profile"),
         BotCommand("quiz", "Choose quiz difficulty and start"),
         BotCommand("leaderboard", "See top scorers"),
+        BotCommand("stats", "See answer statistics"),
         BotCommand("user_info", "Check your own information"),
         BotCommand("all_users", "List all users who have interacted with the bot"),
+        BotCommand("export_users", "Download all users as CSV"),
         BotCommand("set_language", "Change the bot's language"),
         BotCommand("my_quizzes", "See your quiz history"),
         BotCommand("schedule_quiz", "Schedule automatic quizzes"),
@@ -46,8 +216,28 @@ def main():
     logging.info("Commands menu setup complete")
     
     # Start the bot
-    logging.info("Starting polling...")
-    application.run_polling()
+    if RUN_MODE == 'webhook':
+        secret = WEBHOOK_SECRET
+        if secret is None and WEBHOOK_URL:
+            # We register the webhook ourselves, so a random secret works
+            secret = secrets.token_urlsafe(32)
+        server = WebhookServer(
+            application,
+            path=WEBHOOK_PATH,
+            secret_token=secret,
+            host=WEBHOOK_HOST,
+            port=WEBHOOK_PORT,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            drain_timeout=WEBHOOK_DRAIN_TIMEOUT
+        )
+        logging.info("Starting webhook server...")
+        asyncio.run(serve(application, server, WEBHOOK_URL))
+    else:
+        logging.info("Starting polling...")
+        application.run_polling()
+    
+    if router:
+        router.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -17,4 +17,123 @@ if not ADMIN_ID:
 YOUR_ADMIN_ID = ADMIN_ID
 
 DB_NAME = 'quiz_bot.db'
-LANGUAGES = {'en': 'English', 'es': 'Español', 'fr': 'Français'} 
\ No newline at end of file
+LANGUAGES = {'en': 'English', 'es': 'Español', 'fr': 'Français'}
+
+# Question pool (opentdb returns at most 50 questions per request)
+QUESTION_POOL_BATCH_SIZE = int(os.getenv("QUESTION_POOL_BATCH_SIZE", "50"))
+QUESTION_POOL_LOW_WATERMARK = int(os.getenv("QUESTION_POOL_LOW_WATERMARK", "10"))
+QUESTION_POOL_HIGH_WATERMARK = int(os.getenv("QUESTION_POOL_HIGH_WATERMARK", "100"))
+# Where questions come from: "api" (opentdb only), "local" (the question bank
+# only) or "hybrid" (opentdb, falling back to the bank when it has nothing ready)
+QUESTION_SOURCE = os.getenv("QUESTION_SOURCE", "hybrid")
+# Questions remembered per user to avoid repeats (between one and two times
+# this many), and the chance of an unseen question being taken for seen
+SEEN_SET_CAPACITY = int(os.getenv("SEEN_SET_CAPACITY", "1000"))
+SEEN_SET_ERROR_RATE = float(os.getenv("SEEN_SET_ERROR_RATE", "0.01"))
+
+# Shared HTTP client for the trivia API
+QUIZ_API_POOL_SIZE = int(os.getenv("QUIZ_API_POOL_SIZE", "10"))
+QUIZ_API_CONNECT_TIMEOUT = float(os.getenv("QUIZ_API_CONNECT_TIMEOUT", "5"))
+QUIZ_API_REQUEST_TIMEOUT = float(os.getenv("QUIZ_API_REQUEST_TIMEOUT", "10"))
+QUIZ_API_READ_TIMEOUT = float(os.getenv("QUIZ_API_READ_TIMEOUT", "5"))
+QUIZ_API_URL = os.getenv("QUIZ_API_URL", "https://opentdb.com/api.php")
+# Seconds between requests from this host, shared by all workers (opentdb
+# allows one per 5 seconds per IP), and retries per batch after a timeout or
+# server error
+QUIZ_API_MIN_INTERVAL = float(os.getenv("QUIZ_API_MIN_INTERVAL", "5"))
+QUIZ_API_MAX_RETRIES = int(os.getenv("QUIZ_API_MAX_RETRIES", "2"))
+# Consecutive failures that open the circuit breaker, and seconds it stays
+# open before a single probe request is let through
+QUIZ_API_BREAKER_THRESHOLD = int(os.getenv("QUIZ_API_BREAKER_THRESHOLD", "3"))
+QUIZ_API_BREAKER_RESET = float(os.getenv("QUIZ_API_BREAKER_RESET", "30"))
+# Use an opentdb session token so batches do not repeat questions
+QUIZ_API_USE_TOKEN = os.getenv("QUIZ_API_USE_TOKEN", "true").lower() == "true"
+
+# Thread pools that keep blocking database and translation calls off the event loop
+DB_READER_THREADS = int(os.getenv("DB_READER_THREADS", "4"))
+TRANSLATION_THREADS = int(os.getenv("TRANSLATION_THREADS", "4"))
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "5"))
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+# Directory of <lang>.json catalogs translating the bot's own UI strings
+TRANSLATION_CATALOG_DIR = os.getenv(
+    "TRANSLATION_CATALOG_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "locale")
+)
+
+# Write-behind buffering for quiz attempts and score changes.
+# "batched" commits buffered rows every DB_FLUSH_INTERVAL_MS or DB_FLUSH_MAX_ROWS rows;
+# "sync" commits every write immediately.
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "batched")
+DB_FLUSH_INTERVAL_MS = int(os.getenv("DB_FLUSH_INTERVAL_MS", "250"))
+DB_FLUSH_MAX_ROWS = int(os.getenv("DB_FLUSH_MAX_ROWS", "500"))
+
+# Points awarded for a correct answer at each difficulty
+DIFFICULTY_POINTS = {
+    'easy': int(os.getenv("POINTS_EASY", "1")),
+    'medium': int(os.getenv("POINTS_MEDIUM", "1")),
+    'hard': int(os.getenv("POINTS_HARD", "1")),
+}
+
+# Cached user profiles (username, language, score)
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "100000"))
+
+# Scheduled quizzes
+SCHEDULE_INTERVAL = int(os.getenv("SCHEDULE_INTERVAL", "1800"))
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "1"))
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "30"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "8"))
+
+# Seconds between answering a question and receiving the next one
+NEXT_QUIZ_DELAY = float(os.getenv("NEXT_QUIZ_DELAY", "3"))
+# Number of updates processed at once; 0 handles them one at a time
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "0"))
+
+# Outbound message queue. Telegram allows about 30 messages/second overall
+# and about 1 message/second to the same chat before answering with 429s.
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_PER_CHAT_RATE = float(os.getenv("OUTBOUND_PER_CHAT_RATE", "1"))
+OUTBOUND_PER_CHAT_BURST = float(os.getenv("OUTBOUND_PER_CHAT_BURST", "3"))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "32"))
+
+# "polling" or "webhook"
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+# Public HTTPS URL Telegram posts to; leave unset if the webhook is registered elsewhere
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# Telegram accepts 1-100
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+
+# Worker processes sharing update ingest, sharded by user id; 1 runs everything in one process
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "10000"))
+# Seconds between leaderboard reloads in worker mode
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "10"))
+# Where active questions and difficulty choices live: "memory" or "sqlite".
+# Worker mode defaults to "sqlite" so every worker sees the same state.
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite" if WORKERS > 1 else "memory")
+# Unanswered questions are forgotten after this many seconds, or once the
+# in-memory backend holds more than ACTIVE_QUESTION_MAX of them
+ACTIVE_QUESTION_TTL = float(os.getenv("ACTIVE_QUESTION_TTL", "21600"))
+ACTIVE_QUESTION_MAX = int(os.getenv("ACTIVE_QUESTION_MAX", "100000"))
+
+# Rows per page of /all_users, /my_quizzes and /score_history
+USERS_PAGE_SIZE = int(os.getenv("USERS_PAGE_SIZE", "20"))
+QUIZZES_PAGE_SIZE = int(os.getenv("QUIZZES_PAGE_SIZE", "5"))
+SCORE_HISTORY_PAGE_SIZE = int(os.getenv("SCORE_HISTORY_PAGE_SIZE", "10"))
+
+# Seconds between refreshes of the /leaderboard and /stats snapshot
+STATS_REFRESH_INTERVAL = float(os.getenv("STATS_REFRESH_INTERVAL", "30"))
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "10"))
+
+# score_history rows older than this many days are rolled up per day, and
+# quizzes rows are moved to the compressed archive. Retention runs every
+# RETENTION_INTERVAL seconds; 0 turns it off.
+RETENTION_SCORE_HISTORY_DAYS = int(os.getenv("RETENTION_SCORE_HISTORY_DAYS", "30"))
+RETENTION_QUIZZES_DAYS = int(os.getenv("RETENTION_QUIZZES_DAYS", "90"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "86400"))
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from src.utils.rate_limit import TokenBucket
+
+# Priority lanes, served in this order
+INTERACTIVE = 0
+SCHEDULED = 1
+LANES = (INTERACTIVE, SCHEDULED)
+
+class _Delivery:
+    __slots__ = ('chat_id', 'call', 'priority', 'future', 'attempts')
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable], priority: int, future: asyncio.Future):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+
+class OutboundQueue:
+    """Rate-limited delivery of outgoing Telegram API calls.
+
+    Every send, reply and edit is queued here instead of going straight to
+    the Bot API. A global token bucket keeps the bot under ``global_rate``
+    messages per second, and per-chat buckets keep each chat under
+    ``per_chat_rate``. The interactive lane is always drained before the
+    scheduled lane. A 429 ``RetryAfter`` pauses all delivery for the
+    requested time and puts the message back at the front of its lane.
+    Network errors are retried with bounded exponential backoff.
+    """
+
+    # How far into a lane to look for a message whose chat is not throttled
+    SCAN_WINDOW = 50
+
+    def __init__(self, global_rate: float = 30.0, per_chat_rate: float = 1.0, per_chat_burst: float = 3.0,
+                 max_retries: int = 3, max_backoff: float = 10.0, max_in_flight: int = 32):
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._global = TokenBucket(global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._lanes: Dict[int, Deque[_Delivery]] = {lane: deque() for lane in LANES}
+        self._paused_until = 0.0
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = {'sent': 0, 'retried': 0, 'rate_limited': 0, 'failed': 0}
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued messages up to ``timeout`` seconds to drain, then stop."""
+        deadline = time.monotonic() + timeout
+        while any(self._lanes.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for lane in self._lanes.values():
+            while lane:
+                lane.popleft().future.cancel()
+
+    def metrics(self) -> Dict:
+        """Queue depth per lane plus delivery counters."""
+        return dict(
+            self._metrics,
+            interactive_depth=len(self._lanes[INTERACTIVE]),
+            scheduled_depth=len(self._lanes[SCHEDULED]),
+            throttled_chats=len(self._chats),
+        )
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable], priority: int = INTERACTIVE):
+        """Queue ``call`` (a function returning the API coroutine) and wait for its result."""
+        if self._task is None:
+            return await call()
+        delivery = _Delivery(chat_id, call, priority, asyncio.get_running_loop().create_future())
+        self._lanes[priority].append(delivery)
+        self._wakeup.set()
+        return await delivery.future
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    def _next_ready(self):
+        """Pop the first message, by lane priority, whose chat may send now. Otherwise return the wait time."""
+        wait = None
+        for lane in self._lanes.values():
+            for position, delivery in enumerate(lane):
+                if position >= self.SCAN_WINDOW:
+                    break
+                bucket = self._chat_bucket(delivery.chat_id)
+                if bucket.try_acquire():
+                    del lane[position]
+                    return delivery, None
+                delay = bucket.delay()
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _forget_idle_chats(self):
+        idle = [chat_id for chat_id, bucket in self._chats.items() if bucket.is_full()]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    async def _run(self):
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            delivery, wait = self._next_ready()
+            if delivery is None:
+                self._wakeup.clear()
+                if len(self._chats) > 10000:
+                    self._forget_idle_chats()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._global.acquire()
+            await self._in_flight.acquire()
+            asyncio.create_task(self._deliver(delivery))
+
+    async def _deliver(self, delivery: _Delivery):
+        try:
+            result = await delivery.call()
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            logging.warning(f"Flood control for chat {delivery.chat_id}, pausing delivery for {seconds}s")
+            self._metrics['rate_limited'] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._requeue(delivery, front=True)
+        except BadRequest as e:
+            self._fail(delivery, e)
+        except NetworkError as e:
+            delivery.attempts += 1
+            if delivery.attempts > self.max_retries:
+                self._fail(delivery, e)
+            else:
+                self._metrics['retried'] += 1
+                backoff = min(self.max_backoff, 0.5 * 2 ** delivery.attempts)
+                logging.warning(f"Send to chat {delivery.chat_id} failed ({e}), retrying in {backoff}s")
+                asyncio.get_running_loop().call_later(backoff, self._requeue, delivery)
+        except Exception as e:
+            self._fail(delivery, e)
+        else:
+            self._metrics['sent'] += 1
+            if not delivery.future.done():
+                delivery.future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+    def _requeue(self, delivery: _Delivery, front: bool = False):
+        lane = self._lanes[delivery.priority]
+        if front:
+            lane.appendleft(delivery)
+        else:
+            lane.append(delivery)
+        self._wakeup.set()
+
+    def _fail(self, delivery: _Delivery, error: Exception):
+        self._metrics['failed'] += 1
+        if not delivery.future.done():
+            delivery.future.set_exception(error)
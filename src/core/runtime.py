@@ -0,0 +1,24 @@
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def running(application):
+    """Start the application for the duration of the block, without an updater.
+
+    Follows the startup and shutdown order of ``run_polling``, including the
+    post_init, post_stop and post_shutdown hooks, for run modes that feed
+    ``application.update_queue`` themselves.
+    """
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        yield application
+    finally:
+        # Processes whatever is left on the update queue before returning
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram.ext import CallbackContext
+
+from src.core.outbound import SCHEDULED
+from src.database import aio
+
+class Schedule:
+    __slots__ = ('user_id', 'interval', 'difficulty', 'next_run')
+
+    def __init__(self, user_id: int, interval: int, difficulty: Optional[str], next_run: float):
+        self.user_id = user_id
+        self.interval = interval
+        self.difficulty = difficulty
+        self.next_run = next_run
+
+class QuizScheduler:
+    """Sends scheduled quizzes for every subscriber from one tick loop.
+
+    Schedules live in the ``schedules`` table and in a heap ordered by next
+    run time. Each tick pops every due user, groups them by difficulty and
+    draws one question per group from the question pool, so a burst of due
+    users costs one pool read and one translation per language (users who
+    have already seen that question are sent another one). Sends go
+    through a bounded queue drained by ``workers`` tasks and are delivered in
+    the outbound queue's scheduled lane, behind interactive replies, which
+    also takes care of Telegram's rate limits. Each next run gets up to
+    ``jitter`` seconds of random delay so subscribers who signed up together
+    drift apart instead of firing in the same tick forever.
+    """
+
+    def __init__(self, application, send, tick: float = 1.0, jitter: float = 30.0, workers: int = 8,
+                 owns: Optional[Callable[[int], bool]] = None):
+        self.application = application
+        # In worker mode each process only runs the schedules of the users it serves
+        self.owns = owns
+        self.send = send
+        self.tick = tick
+        self.jitter = jitter
+        self.worker_count = workers
+        self._schedules: Dict[int, Schedule] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._schedules
+
+    def __len__(self):
+        return len(self._schedules)
+
+    async def start(self):
+        """Restore persisted schedules and start the tick loop and workers."""
+        for user_id, interval, difficulty, next_run in await aio.get_schedules():
+            if self.owns is not None and not self.owns(user_id):
+                continue
+            self._push(Schedule(user_id, interval, difficulty, next_run))
+        logging.info(f"Restored {len(self._schedules)} quiz schedules")
+        self._queue = asyncio.Queue(maxsize=self.worker_count * 100)
+        self._tasks = [asyncio.create_task(self._tick_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def add(self, user_id: int, interval: int, difficulty: Optional[str] = None,
+                  first_delay: float = 5.0):
+        """Create or replace a user's schedule; the first quiz goes out after first_delay seconds."""
+        schedule = Schedule(user_id, interval, difficulty, time.time() + first_delay)
+        await aio.save_schedule(user_id, interval, difficulty, schedule.next_run)
+        self._push(schedule)
+
+    async def remove(self, user_id: int) -> bool:
+        """Cancel a user's schedule. Returns False if there was none."""
+        if self._schedules.pop(user_id, None) is None:
+            return False
+        await aio.delete_schedule(user_id)
+        return True
+
+    def _push(self, schedule: Schedule):
+        self._schedules[schedule.user_id] = schedule
+        heapq.heappush(self._heap, (schedule.next_run, schedule.user_id))
+
+    def _pop_due(self, now: float) -> Dict[Optional[str], List[int]]:
+        due = defaultdict(list)
+        while self._heap and self._heap[0][0] <= now:
+            run_at, user_id = heapq.heappop(self._heap)
+            schedule = self._schedules.get(user_id)
+            # Entries for removed or rescheduled users are dropped lazily
+            if schedule is None or schedule.next_run != run_at:
+                continue
+            schedule.next_run = now + schedule.interval + random.uniform(0, self.jitter)
+            heapq.heappush(self._heap, (schedule.next_run, user_id))
+            due[schedule.difficulty].append(user_id)
+        return due
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self._dispatch(self._pop_due(time.time()))
+            except Exception as e:
+                logging.error(f"Error dispatching scheduled quizzes: {e}")
+
+    async def _dispatch(self, due: Dict[Optional[str], List[int]]):
+        if not due:
+            return
+        await aio.update_schedule_runs([
+            (self._schedules[user_id].next_run, user_id)
+            for user_ids in due.values() for user_id in user_ids
+        ])
+        pool = self.application.bot_data['question_source']
+        for difficulty, user_ids in due.items():
+            question = await pool.get(difficulty)
+            for user_id in user_ids:
+                await self._queue.put((user_id, difficulty, question))
+
+    async def _worker(self):
+        while True:
+            user_id, difficulty, question = await self._queue.get()
+            try:
+                context = CallbackContext(self.application, chat_id=user_id, user_id=user_id)
+                await self.send(context, user_id, difficulty, question, priority=SCHEDULED)
+            except Exception as e:
+                logging.error(f"Error sending scheduled quiz to {user_id}: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,129 @@
+"""
+Materialized statistics for /leaderboard, /stats and /user_info.
+
+A background loop recomputes the snapshot every few seconds: the top of
+the leaderboard, answers and accuracy per difficulty and per user, and
+totals. Answer counts are folded in incrementally from the quizzes logged
+since the previous refresh, so a refresh costs a primary key range scan
+rather than a pass over the whole table.
+
+Every change to the shared views bumps ``version``. Their text is rendered
+at most once per version and language, and the version doubles as an ETag:
+a refresh button carrying the version it was rendered at can be answered
+with "unchanged" without rendering or editing anything.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.database import aio
+from src.database.leaderboard import leaderboard
+from src.handlers import messages
+from src.utils.utils import translate_ui, translate_template
+
+# Shared views, as encoded in refresh callbacks
+LEADERBOARD_VIEW = 'b'
+STATS_VIEW = 's'
+
+DIFFICULTY_ORDER = ('easy', 'medium', 'hard')
+
+def accuracy(answered: int, correct: int) -> int:
+    return round(100 * correct / answered) if answered else 0
+
+class StatsSnapshot:
+    """The latest statistics and their rendered text per (view, language)."""
+
+    def __init__(self, interval: float = 30.0, top_n: int = 10):
+        self.interval = interval
+        self.top_n = top_n
+        # Starting from the clock keeps buttons sent before a restart from matching
+        self.version = int(time.time())
+        self.leaders: List[Tuple[str, int]] = []
+        self.players = 0
+        # difficulty or user id -> [answered, correct]
+        self.difficulties: Dict[str, List[int]] = {}
+        self.users: Dict[int, List[int]] = {}
+        self._last_quiz_id = 0
+        self._rendered: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Take the first snapshot, then keep refreshing it in the background."""
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing stats: {e}")
+
+    async def refresh(self):
+        self._last_quiz_id, rows = await aio.get_quiz_totals_since(self._last_quiz_id)
+        for user_id, difficulty, answered, correct in rows:
+            for totals in (
+                self.difficulties.setdefault(difficulty or 'unknown', [0, 0]),
+                self.users.setdefault(user_id, [0, 0]),
+            ):
+                totals[0] += answered
+                totals[1] += correct
+        leaders = leaderboard.top(self.top_n)
+        players = len(leaderboard)
+        if rows or leaders != self.leaders or players != self.players:
+            self.leaders = leaders
+            self.players = players
+            self.version += 1
+
+    def user_totals(self, user_id: int) -> Tuple[int, int]:
+        """(answered, correct) for a user as of the last refresh."""
+        answered, correct = self.users.get(user_id, (0, 0))
+        return answered, correct
+
+    def render(self, view: str, lang: str) -> str:
+        """The text of a shared view in lang, rendered once per version."""
+        cached = self._rendered.get((view, lang))
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        text = RENDERERS[view](self, lang)
+        self._rendered[(view, lang)] = (self.version, text)
+        return text
+
+def render_leaderboard(stats: StatsSnapshot, lang: str) -> str:
+    lines = [f"*{translate_ui(messages.LEADERBOARD_TITLE, lang)}*", ""]
+    for rank, (username, score) in enumerate(stats.leaders, 1):
+        lines.append(translate_template(messages.LEADERBOARD_ENTRY, lang, rank, username, score))
+    return "\n".join(lines)
+
+def render_stats(stats: StatsSnapshot, lang: str) -> str:
+    answered = sum(totals[0] for totals in stats.difficulties.values())
+    correct = sum(totals[1] for totals in stats.difficulties.values())
+    lines = [
+        f"*{translate_ui(messages.STATS_TITLE, lang)}*",
+        "",
+        translate_template(messages.STATS_TOTALS, lang, stats.players, answered, accuracy(answered, correct)),
+        "",
+    ]
+    known = [difficulty for difficulty in DIFFICULTY_ORDER if difficulty in stats.difficulties]
+    for difficulty in known + sorted(set(stats.difficulties) - set(known)):
+        difficulty_answered, difficulty_correct = stats.difficulties[difficulty]
+        name = messages.DIFFICULTY_NAMES.get(difficulty)
+        lines.append(translate_template(
+            messages.STATS_DIFFICULTY, lang,
+            translate_ui(name, lang) if name else difficulty.capitalize(),
+            accuracy(difficulty_answered, difficulty_correct), difficulty_answered
+        ))
+    return "\n".join(lines)
+
+RENDERERS = {
+    LEADERBOARD_VIEW: render_leaderboard,
+    STATS_VIEW: render_stats,
+}
@@ -0,0 +1,130 @@
+import asyncio
+import hmac
+import logging
+import signal
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+from telegram import Update
+
+from src.core.runtime import running
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """Embedded aiohttp server that feeds Telegram webhook updates to the application.
+
+    Updates POSTed to ``path`` are checked against ``secret_token``, decoded
+    and put on the application's update queue, so the handlers run exactly
+    as they do under polling. At most ``max_connections`` requests are
+    processed at once; the same value is passed to Telegram in
+    ``setWebhook``. ``/healthz`` reports that the process is up and
+    ``/readyz`` that it is accepting updates. On stop the server refuses new
+    updates with 503, which Telegram retries, and waits up to
+    ``drain_timeout`` seconds for in-flight requests before closing.
+    """
+
+    def __init__(self, application, path: str = '/telegram', secret_token: Optional[str] = None,
+                 host: str = '0.0.0.0', port: int = 8443, max_connections: int = 40,
+                 drain_timeout: float = 10.0):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.drain_timeout = drain_timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._ready = False
+        self._in_flight = 0
+        self._metrics = {'received': 0, 'rejected': 0, 'invalid': 0}
+
+    def metrics(self) -> Dict:
+        return dict(self._metrics, in_flight=self._in_flight, queued=self.application.update_queue.qsize())
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.max_connections)
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_update)
+        app.router.add_get('/healthz', self._healthz)
+        app.router.add_get('/readyz', self._readyz)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._ready = True
+        logging.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting updates, let in-flight requests finish, then close the server."""
+        self._ready = False
+        deadline = time.monotonic() + self.drain_timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._in_flight:
+            logging.warning(f"Closing webhook server with {self._in_flight} requests still in flight")
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_update(self, request: web.Request) -> web.Response:
+        if not self._ready:
+            self._metrics['rejected'] += 1
+            return web.Response(status=503)
+        if self.secret_token is not None:
+            received = request.headers.get(SECRET_HEADER, '')
+            if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+                self._metrics['invalid'] += 1
+                return web.Response(status=403)
+        self._in_flight += 1
+        try:
+            async with self._slots:
+                try:
+                    data = await request.json()
+                    update = Update.de_json(data, self.application.bot)
+                except Exception as e:
+                    logging.error(f"Invalid webhook update: {e}")
+                    self._metrics['invalid'] += 1
+                    return web.Response(status=400)
+                await self.application.update_queue.put(update)
+                self._metrics['received'] += 1
+                return web.Response()
+        finally:
+            self._in_flight -= 1
+
+    async def _healthz(self, request: web.Request) -> web.Response:
+        return web.Response(text='ok')
+
+    async def _readyz(self, request: web.Request) -> web.Response:
+        if self._ready and self.application.running:
+            return web.Response(text='ready')
+        return web.Response(status=503, text='not ready')
+
+async def serve(application, server: WebhookServer, webhook_url: Optional[str] = None):
+    """Run the application behind the webhook server until SIGINT or SIGTERM.
+
+    If webhook_url is given the webhook is registered with Telegram once the
+    server is listening.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with running(application):
+        try:
+            await server.start()
+            if webhook_url:
+                await application.bot.set_webhook(
+                    url=webhook_url,
+                    secret_token=server.secret_token,
+                    max_connections=server.max_connections,
+                    allowed_updates=Update.ALL_TYPES
+                )
+                logging.info(f"Webhook registered at {webhook_url}")
+            await stop.wait()
+            logging.info("Shutting down webhook server...")
+        finally:
+            await server.stop()
+            logging.info(f"Webhook server metrics: {server.metrics()}")
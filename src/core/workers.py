@@ -0,0 +1,112 @@
+"""
+Worker mode: several bot processes sharing one update stream.
+
+The parent process receives updates (by polling or webhook, as usual) and
+forwards each one to the worker that owns its user, chosen by a hash of
+the user id. Every update from a user therefore lands on the same worker,
+which keeps per-user ordering, the profile cache and pending next-question
+timers consistent. Quiz state and schedules live in SQLite, so any worker
+can pick up a user after the worker count changes.
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+import zlib
+from typing import List
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from src.core.constants import LEADERBOARD_REFRESH_INTERVAL
+from src.core.runtime import running
+from src.database import aio
+from src.database.database import load_leaderboard
+
+def shard_for(user_id: int, workers: int) -> int:
+    """Index of the worker that owns user_id."""
+    return zlib.crc32(user_id.to_bytes(8, 'little', signed=True)) % workers
+
+def update_owner(update: Update) -> int:
+    """The user id an update is sharded by, or 0 for updates without a user or chat."""
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return 0
+
+class ShardRouter:
+    """Starts the worker processes and forwards updates to them."""
+
+    def __init__(self, workers: int, queue_size: int = 10000):
+        # Worker processes get a fresh interpreter; forking would copy the
+        # database and translation thread pools without their threads
+        context = multiprocessing.get_context('spawn')
+        self.queues = [context.Queue(queue_size) for _ in range(workers)]
+        self.processes = [
+            context.Process(target=run_worker, args=(index, workers, queue), name=f'quiz-worker-{index}')
+            for index, queue in enumerate(self.queues)
+        ]
+        self.forwarded: List[int] = [0] * workers
+
+    def install(self, application):
+        """Make the application forward every update instead of handling it."""
+        application.add_handler(TypeHandler(Update, self.forward))
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        logging.info(f"Started {len(self.processes)} worker processes")
+
+    async def forward(self, update: Update, context):
+        shard = shard_for(update_owner(update), len(self.queues))
+        # Blocks when the worker falls behind, which slows down ingest instead of dropping updates
+        await asyncio.get_running_loop().run_in_executor(None, self.queues[shard].put, update.to_dict())
+        self.forwarded[shard] += 1
+
+    def stop(self, timeout: float = 30.0):
+        """Let every worker finish its queued updates, then wait for it to exit."""
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logging.warning(f"{process.name} did not stop in {timeout}s, terminating")
+                process.terminate()
+        logging.info(f"Updates forwarded per worker: {self.forwarded}")
+
+async def refresh_leaderboard_loop(interval: float):
+    """Periodically pick up score changes made by the other workers."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await aio.refresh_leaderboard()
+        except Exception as e:
+            logging.error(f"Error refreshing leaderboard: {e}")
+
+async def serve_shard(application, queue, refresh_interval: float):
+    """Run the application on the updates arriving on queue until a None sentinel."""
+    loop = asyncio.get_running_loop()
+    async with running(application):
+        refresher = asyncio.create_task(refresh_leaderboard_loop(refresh_interval))
+        try:
+            while True:
+                data = await loop.run_in_executor(None, queue.get)
+                if data is None:
+                    break
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        finally:
+            refresher.cancel()
+
+def run_worker(index: int, workers: int, queue):
+    """Entry point of a worker process."""
+    # Ctrl+C reaches the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Imported here because bot.py imports this module
+    from src.core.bot import build_application
+    application = build_application(
+        workers, owns=lambda user_id: shard_for(user_id, workers) == index, maintenance=index == 0
+    )
+    load_leaderboard()
+    logging.info(f"Worker {index} of {workers} ready")
+    asyncio.run(serve_shard(application, queue, LEADERBOARD_REFRESH_INTERVAL))
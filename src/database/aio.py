@@ -0,0 +1,174 @@
+"""
+Awaitable wrappers around the database functions.
+
+Reads run on a small thread pool, each thread holding its own connection.
+All writes go through a single dedicated writer thread, so SQLite never
+sees competing writers and the event loop never blocks on a commit.
+
+In "batched" write mode quiz attempts and score changes are buffered in
+``database.write_behind`` and committed together by ``write_behind_loop``,
+as are last_interaction times, seen-question sets and translations in
+either mode.
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.core.constants import (
+    DB_READER_THREADS,
+    DB_WRITE_MODE,
+    DB_FLUSH_INTERVAL_MS,
+    DB_FLUSH_MAX_ROWS,
+    PROFILE_CACHE_TTL,
+    PROFILE_CACHE_SIZE
+)
+from src.database import database
+from src.database.profiles import ProfileCache, UserProfile
+
+_reader_pool = ThreadPoolExecutor(max_workers=DB_READER_THREADS, thread_name_prefix='db-read')
+_writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-write')
+
+async def run_read(func, *args, **kwargs):
+    """Run a blocking read on the reader pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_reader_pool, functools.partial(func, *args, **kwargs))
+
+async def run_write(func, *args, **kwargs):
+    """Run a blocking write on the writer thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer_pool, functools.partial(func, *args, **kwargs))
+
+def _reader(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_read(func, *args, **kwargs)
+    return wrapper
+
+def _writer(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_write(func, *args, **kwargs)
+    return wrapper
+
+save_schedule = _writer(database.save_schedule)
+delete_schedule = _writer(database.delete_schedule)
+update_schedule_runs = _writer(database.update_schedule_runs)
+save_active_question = _writer(database.save_active_question)
+pop_active_question = _writer(database.pop_active_question)
+purge_active_questions = _writer(database.purge_active_questions)
+set_quiz_difficulty = _writer(database.set_quiz_difficulty)
+add_bank_questions = _writer(database.add_bank_questions)
+
+# Run on the writer thread so buffered score changes and seen sets are included
+get_user_score = _writer(database.get_projected_user_score)
+get_seen_questions = _writer(database.get_projected_seen_questions)
+get_user_info = _reader(database.get_user_info)
+get_users_page = _reader(database.get_users_page)
+get_quizzes_page = _reader(database.get_quizzes_page)
+get_score_history_page = _reader(database.get_score_history_page)
+write_users_csv = _reader(database.write_users_csv)
+get_schedules = _reader(database.get_schedules)
+get_active_question = _reader(database.get_active_question)
+get_quiz_difficulty = _reader(database.get_quiz_difficulty)
+get_question_bank_index = _reader(database.get_question_bank_index)
+get_bank_question = _reader(database.get_bank_question)
+get_quiz_totals_since = _reader(database.get_quiz_totals_since)
+
+profile_cache = ProfileCache(ttl=PROFILE_CACHE_TTL, max_size=PROFILE_CACHE_SIZE)
+
+async def get_profile(user):
+    """Return the user's cached profile, creating or refreshing the row on a miss.
+
+    Also records the interaction; last_interaction is written by the next
+    write-behind flush rather than on every update.
+    """
+    database.write_behind.touch(user.id, datetime.now())
+    profile = profile_cache.get(user.id)
+    if profile is not None and (not user.username or profile.username == user.username):
+        return profile
+    username, language, score = await run_write(database.load_user_profile, user)
+    profile = UserProfile(user.id, username, language, score)
+    profile_cache.put(profile)
+    return profile
+
+async def get_user_language(user_id):
+    """Get the user's language, from the profile cache when possible."""
+    profile = profile_cache.get(user_id)
+    if profile is not None:
+        return profile.language
+    return await run_read(database.get_user_language, user_id)
+
+async def set_user_language(user_id, language):
+    await run_write(database.set_user_language, user_id, language)
+    profile_cache.invalidate(user_id)
+
+async def reset_user_score(user_id):
+    await run_write(database.reset_user_score, user_id)
+    profile_cache.invalidate(user_id)
+
+_flush_requested = None
+
+def _request_flush_if_full():
+    if _flush_requested is not None and len(database.write_behind) >= DB_FLUSH_MAX_ROWS:
+        _flush_requested.set()
+
+async def record_answer(user_id, question, answer, quiz_type, difficulty, correct):
+    """Log an answer and award its points, returning the new score for correct answers.
+
+    In batched write mode both writes are buffered and the returned score
+    includes them even before they are committed.
+    """
+    if DB_WRITE_MODE == 'sync':
+        new_score = await run_write(database.record_answer, user_id, question, answer, quiz_type, difficulty, correct)
+    else:
+        points = database.answer_points(difficulty, correct)
+        database.write_behind.add_attempt(user_id, question, answer, quiz_type, difficulty, correct)
+        if points:
+            database.write_behind.add_score_change(user_id, points)
+        _request_flush_if_full()
+        if not points:
+            return None
+        new_score = await run_write(database.get_projected_user_score, user_id)
+    profile = profile_cache.get(user_id)
+    if profile is not None and new_score is not None:
+        profile.score = new_score
+    return new_score
+
+def save_seen_questions(user_id, seen):
+    """Buffer the user's serialized SeenSet for the next write-behind flush."""
+    database.write_behind.save_seen(user_id, seen)
+    _request_flush_if_full()
+
+async def flush_writes():
+    """Commit everything in the write-behind buffer."""
+    return await run_write(database.write_behind.flush)
+
+async def write_behind_loop():
+    """Flush buffered writes every DB_FLUSH_INTERVAL_MS, or sooner once DB_FLUSH_MAX_ROWS are queued."""
+    global _flush_requested
+    _flush_requested = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(_flush_requested.wait(), timeout=DB_FLUSH_INTERVAL_MS / 1000)
+        except asyncio.TimeoutError:
+            pass
+        _flush_requested.clear()
+        try:
+            await flush_writes()
+        except Exception as e:
+            logging.error(f"Error in write-behind flush: {e}")
+
+async def refresh_leaderboard():
+    """Reload the in-memory leaderboard from the users table.
+
+    Needed when several processes write scores, since each one only sees
+    its own updates otherwise.
+    """
+    await flush_writes()
+    await run_read(database.load_leaderboard)
+
+def shutdown():
+    """Wait for queued database work to finish and stop the threads."""
+    _writer_pool.shutdown(wait=True)
+    _reader_pool.shutdown(wait=True)
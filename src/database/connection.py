@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from src.core.constants import DB_NAME
+
+# Applied once to every new connection. WAL lets readers run alongside the
+# writer and synchronous=NORMAL only fsyncs at checkpoints instead of on
+# every commit. auto_vacuum only takes effect on a new database or after a
+# VACUUM; it lets retention hand freed pages back with incremental_vacuum.
+PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Size of each connection's prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+# Bumped by close_connections() so threads drop their stale handles
+_generation = 0
+
+def _connect():
+    conn = sqlite3.connect(
+        DB_NAME,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_connection():
+    """Return this thread's long-lived connection, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.generation != _generation:
+        conn = _connect()
+        _local.conn = conn
+        _local.generation = _generation
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+@contextmanager
+def transaction():
+    """Yield a cursor inside a transaction that commits on success and rolls back on error."""
+    conn = get_connection()
+    with conn:
+        yield conn.cursor()
+
+def close_connections():
+    """Close every connection opened through this module."""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Error closing database connection: {e}")
+        _connections.clear()
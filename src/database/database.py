@@ -1,6 +1,17 @@
 import sqlite3
+import threading
+import json
+import hashlib
+import csv
+import io
+import time
+import zlib
+from collections import defaultdict
 from datetime import datetime
-from src.core.constants import DB_NAME
+from src.database.connection import get_connection, transaction
+from src.database.migrations import run_migrations
+from src.database.leaderboard import leaderboard
+from src.core.constants import DIFFICULTY_POINTS
 import logging
 
 # Function to adapt datetime objects for SQLite
@@ -11,155 +22,565 @@ def adapt_datetime(dt):
 sqlite3.register_adapter(datetime, adapt_datetime)
 
 def setup_db():
-    """Create tables if they don't exist."""
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT,
-                score INTEGER DEFAULT 0,
-                language TEXT DEFAULT 'en',
-                last_interaction TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Check if difficulty column exists, if not, alter the table
-        c.execute("PRAGMA table_info(quizzes)")
-        columns = c.fetchall()
-        column_names = [column[1] for column in columns]
-        
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS quizzes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                question TEXT,
-                answer TEXT,
-                quiz_type TEXT,
-                difficulty TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'active',
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """)
-        
-        # If difficulty column is missing, try to add it
-        if 'difficulty' not in column_names:
-            try:
-                c.execute("""
-                    ALTER TABLE quizzes 
-                    ADD COLUMN difficulty TEXT
-                """)
-            except sqlite3.OperationalError:
-                # Column might already exist
-                pass
-        
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS user_audit (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                old_username TEXT,
-                new_username TEXT,
-                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS score_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                score INTEGER,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """)
-        conn.commit()
-
-def ensure_user_in_db(user):
-    """Ensure the user exists in the database."""
+    """Create or upgrade the schema by applying pending migrations."""
+    version = run_migrations(get_connection())
+    logging.info(f"Database schema at version {version}")
+
+def load_leaderboard():
+    """Populate the in-memory leaderboard from the users table."""
+    c = get_connection().execute("SELECT id, username, score FROM users")
+    leaderboard.load(c)
+    logging.info(f"Leaderboard loaded with {len(leaderboard)} users")
+
+def load_user_profile(user):
+    """Create or refresh the user's row and return (username, language, score).
+
+    last_interaction is left to the write-behind queue, so an existing user
+    with an unchanged username costs one SELECT.
+    """
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("SELECT id, username FROM users WHERE id=?", (user.id,))
+        with transaction() as c:
+            c.execute("SELECT username, language, score FROM users WHERE id=?", (user.id,))
             result = c.fetchone()
-            
-            current_time = datetime.now()
-            
             if result is None:
-                # New user
+                current_time = datetime.now()
+                username = user.username or 'Anonymous'
                 c.execute("""
                     INSERT INTO users (id, username, score, last_interaction, created_at)
                     VALUES (?, ?, ?, ?, ?)
-                """, (user.id, user.username or 'Anonymous', 0, current_time, current_time))
-                
-                # Initialize score history
+                """, (user.id, username, 0, current_time, current_time))
                 c.execute("""
                     INSERT INTO score_history (user_id, score)
                     VALUES (?, 0)
                 """, (user.id,))
-            else:
-                # Existing user - check if username changed
-                old_username = result[1]
-                if user.username and old_username != user.username:
-                    c.execute("""
-                        INSERT INTO user_audit (user_id, old_username, new_username)
-                        VALUES (?, ?, ?)
-                    """, (user.id, old_username, user.username))
-                    c.execute("UPDATE users SET username=? WHERE id=?", (user.username, user.id))
-                
-                # Update last interaction
-                c.execute("UPDATE users SET last_interaction=? WHERE id=?", (current_time, user.id))
-            
-            conn.commit()
+                leaderboard.update(user.id, 0, username)
+                return username, 'en', 0
+
+            old_username, language, score = result
+            if user.username and old_username != user.username:
+                c.execute("""
+                    INSERT INTO user_audit (user_id, old_username, new_username)
+                    VALUES (?, ?, ?)
+                """, (user.id, old_username, user.username))
+                c.execute("UPDATE users SET username=? WHERE id=?", (user.username, user.id))
+                leaderboard.set_username(user.id, user.username)
+                return user.username, language, score
+            return old_username, language, score
     except sqlite3.Error as e:
-        logging.error(f"Database error in ensure_user_in_db: {e}")
+        logging.error(f"Database error in load_user_profile: {e}")
+        return user.username or 'Anonymous', 'en', 0
 
 def get_user_language(user_id):
     """Get the user's preferred language."""
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("SELECT language FROM users WHERE id=?", (user_id,))
-        result = c.fetchone()
+    c = get_connection().execute("SELECT language FROM users WHERE id=?", (user_id,))
+    result = c.fetchone()
     return result[0] if result else 'en'
 
-def update_user_score(user_id, new_score):
-    """Update user's score and add to history."""
+def answer_points(difficulty, correct):
+    """Points awarded for an answer at the given difficulty."""
+    if not correct:
+        return 0
+    return DIFFICULTY_POINTS.get(difficulty, DIFFICULTY_POINTS['easy'])
+
+_INSERT_ATTEMPT = """
+    INSERT INTO quizzes (user_id, question, answer, quiz_type, difficulty, is_correct, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+"""
+
+def _attempt_row(user_id, question, answer, quiz_type, difficulty, correct):
+    return (user_id, str(question), str(answer), str(quiz_type or 'General'),
+            str(difficulty or 'unknown'), int(bool(correct)))
+
+def record_answer(user_id, question, answer, quiz_type, difficulty, correct):
+    """Log an answered question and award its points in one transaction.
+
+    Returns the user's new score for a correct answer and None otherwise.
+    """
+    points = answer_points(difficulty, correct)
+    try:
+        with transaction() as c:
+            c.execute(_INSERT_ATTEMPT, _attempt_row(user_id, question, answer, quiz_type, difficulty, correct))
+            return _apply_score_delta(c, user_id, points) if points else None
+    except sqlite3.Error as e:
+        logging.error(f"Database error in record_answer: {e}")
+        return None
+
+def _apply_score_delta(c, user_id, delta):
+    c.execute("UPDATE users SET score = score + ? WHERE id = ? RETURNING score", (delta, user_id))
+    result = c.fetchone()
+    if result is None:
+        return None
+    c.execute("""
+        INSERT INTO score_history (user_id, score)
+        VALUES (?, ?)
+    """, (user_id, result[0]))
+    leaderboard.update(user_id, result[0])
+    return result[0]
+
+_SAVE_SEEN = "INSERT OR REPLACE INTO seen_questions (user_id, seen, updated_at) VALUES (?, ?, ?)"
+_STORE_TRANSLATION = "INSERT OR REPLACE INTO translations (text_hash, language, translated) VALUES (?, ?, ?)"
+
+class WriteBehindQueue:
+    """Buffers quiz attempts, score changes, seen-question sets and translations and writes them in a single transaction.
+
+    Callers enqueue rows from the event loop or the translation threads;
+    ``flush`` runs on the database writer thread. Until a score change is committed it is still reported
+    by ``pending_score_delta`` so callers can show an up-to-date total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attempts = []
+        self._score_changes = []
+        self._interactions = {}
+        self._seen = {}
+        self._translations = {}
+        self._unflushed_deltas = defaultdict(int)
+
+    def __len__(self):
+        with self._lock:
+            return (len(self._attempts) + len(self._score_changes) + len(self._interactions)
+                    + len(self._seen) + len(self._translations))
+
+    def touch(self, user_id, when):
+        """Record the user's latest interaction; repeated touches before a flush coalesce."""
+        with self._lock:
+            self._interactions[user_id] = when
+
+    def save_seen(self, user_id, seen):
+        """Record the user's serialized SeenSet; only the latest one before a flush is written."""
+        with self._lock:
+            self._seen[user_id] = seen
+
+    def pending_seen(self, user_id):
+        """The user's SeenSet blob that is not yet committed, or None."""
+        with self._lock:
+            return self._seen.get(user_id)
+
+    def store_translation(self, text_hash, language, translated):
+        """Persist a translation so it survives restarts."""
+        with self._lock:
+            self._translations[(text_hash, language)] = translated
+
+    def add_attempt(self, user_id, question, answer, quiz_type, difficulty, correct=None):
+        row = _attempt_row(user_id, question, answer, quiz_type, difficulty, correct)
+        with self._lock:
+            self._attempts.append(row)
+
+    def add_score_change(self, user_id, delta):
+        with self._lock:
+            self._score_changes.append((user_id, delta))
+            self._unflushed_deltas[user_id] += delta
+
+    def pending_score_delta(self, user_id):
+        with self._lock:
+            return self._unflushed_deltas.get(user_id, 0)
+
+    def flush(self):
+        """Write everything buffered so far in one transaction. Returns the number of rows written.
+
+        If the database is busy the rows stay buffered for the next flush.
+        If a row breaks a constraint, e.g. an attempt by a deleted user, the
+        rows are retried one by one and the ones that fail are dropped, as
+        they would fail on every later flush too.
+        """
+        with self._lock:
+            attempts, self._attempts = self._attempts, []
+            score_changes, self._score_changes = self._score_changes, []
+            interactions, self._interactions = self._interactions, {}
+            seen, self._seen = self._seen, {}
+            translations, self._translations = self._translations, {}
+        written = len(attempts) + len(score_changes) + len(interactions) + len(seen) + len(translations)
+        if not written:
+            return 0
+        try:
+            with transaction() as c:
+                self._write(c, attempts, score_changes, interactions, seen, translations)
+        except sqlite3.OperationalError as e:
+            logging.error(f"Database error flushing {written} buffered writes, will retry: {e}")
+            self._requeue(attempts, score_changes, interactions, seen, translations)
+            return 0
+        except sqlite3.Error as e:
+            logging.error(f"Database error flushing {written} buffered writes, writing them one by one: {e}")
+            return self._flush_rows(attempts, score_changes, interactions, seen, translations)
+        self._settle(score_changes)
+        return written
+
+    @staticmethod
+    def _write(c, attempts, score_changes, interactions, seen, translations):
+        c.executemany(_INSERT_ATTEMPT, attempts)
+        for user_id, delta in score_changes:
+            _apply_score_delta(c, user_id, delta)
+        c.executemany(
+            "UPDATE users SET last_interaction = ? WHERE id = ?",
+            [(when, user_id) for user_id, when in interactions.items()]
+        )
+        now = time.time()
+        c.executemany(_SAVE_SEEN, [(user_id, blob, now) for user_id, blob in seen.items()])
+        c.executemany(_STORE_TRANSLATION, [(*key, translated) for key, translated in translations.items()])
+
+    def _flush_rows(self, attempts, score_changes, interactions, seen, translations):
+        rows = (
+            [([attempt], [], {}, {}, {}) for attempt in attempts]
+            + [([], [change], {}, {}, {}) for change in score_changes]
+            + [([], [], {user_id: when}, {}, {}) for user_id, when in interactions.items()]
+            + [([], [], {}, {user_id: blob}, {}) for user_id, blob in seen.items()]
+            + [([], [], {}, {}, {key: translated}) for key, translated in translations.items()]
+        )
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                with transaction() as c:
+                    self._write(c, *row)
+            except sqlite3.OperationalError as e:
+                logging.error(f"Database error writing buffered rows one by one, will retry: {e}")
+                remaining = rows[index:]
+                self._requeue(
+                    [attempt for row in remaining for attempt in row[0]],
+                    [change for row in remaining for change in row[1]],
+                    {user_id: when for row in remaining for user_id, when in row[2].items()},
+                    {user_id: blob for row in remaining for user_id, blob in row[3].items()},
+                    {key: translated for row in remaining for key, translated in row[4].items()},
+                )
+                break
+            except sqlite3.Error as e:
+                logging.error(f"Dropping buffered write that cannot be applied {row}: {e}")
+            else:
+                written += 1
+            # A dropped score change is no longer pending either
+            self._settle(row[1])
+        return written
+
+    def _requeue(self, attempts, score_changes, interactions, seen, translations):
+        with self._lock:
+            self._attempts[:0] = attempts
+            self._score_changes[:0] = score_changes
+            for user_id, when in interactions.items():
+                self._interactions.setdefault(user_id, when)
+            # A set saved since the failed flush already includes these ids
+            for user_id, blob in seen.items():
+                self._seen.setdefault(user_id, blob)
+            for key, translated in translations.items():
+                self._translations.setdefault(key, translated)
+
+    def _settle(self, score_changes):
+        with self._lock:
+            for user_id, delta in score_changes:
+                self._unflushed_deltas[user_id] -= delta
+                if not self._unflushed_deltas[user_id]:
+                    del self._unflushed_deltas[user_id]
+
+write_behind = WriteBehindQueue()
+
+def get_projected_user_score(user_id):
+    """Get the user's score including buffered changes that are not yet committed.
+
+    Must run on the writer thread so it cannot interleave with a flush.
+    """
+    return get_user_score(user_id) + write_behind.pending_score_delta(user_id)
+
+def get_user_score(user_id):
+    """Get the user's current score."""
+    c = get_connection().execute("SELECT score FROM users WHERE id = ?", (user_id,))
+    result = c.fetchone()
+    return result[0] if result else 0
+
+def set_user_language(user_id, language):
+    """Set the user's preferred language."""
+    with transaction() as c:
+        c.execute("UPDATE users SET language = ? WHERE id = ?", (language, user_id))
+
+def reset_user_score(user_id):
+    """Reset the user's score to 0."""
+    # Apply buffered score changes first so none of them land after the reset
+    write_behind.flush()
+    with transaction() as c:
+        c.execute("UPDATE users SET score = 0 WHERE id = ?", (user_id,))
+    leaderboard.update(user_id, 0)
+
+def get_user_info(user_id):
+    """Get (username, score, language, created_at) for a user."""
+    c = get_connection().execute("""
+        SELECT username, score, language, created_at
+        FROM users
+        WHERE id = ?
+    """, (user_id,))
+    return c.fetchone()
+
+def get_quiz_totals_since(last_id):
+    """Aggregate the answers logged after quiz id last_id, archived or not.
+
+    Returns the highest quiz id covered and (user_id, difficulty, answered,
+    correct) rows. Only rows with a recorded outcome count as answered.
+    """
+    conn = get_connection()
+    high = conn.execute("""
+        SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM quizzes), (SELECT COALESCE(MAX(id), 0) FROM quiz_archive))
+    """).fetchone()[0]
+    if high <= last_id:
+        return last_id, []
+    c = conn.execute("""
+        SELECT user_id, difficulty, COUNT(is_correct), COALESCE(SUM(is_correct), 0)
+        FROM (
+            SELECT id, user_id, difficulty, is_correct FROM quizzes
+            UNION ALL
+            SELECT id, user_id, difficulty, is_correct FROM quiz_archive
+        )
+        WHERE id > ? AND id <= ?
+        GROUP BY user_id, difficulty
+    """, (last_id, high))
+    return high, c.fetchall()
+
+def _keyset_page(select, where, params, sort_column, limit, cursor=None, backwards=False):
+    """Fetch one page of a query ordered newest first by (sort_column, id).
+
+    ``select`` must end its column list with sort_column and id, which make
+    up the cursor of a row. Without a cursor the newest page is returned;
+    otherwise the rows older than the cursor, or newer if ``backwards``.
+    Returns the rows, newest first, and whether more rows lie beyond them.
+    """
+    conditions = [where] if where else []
+    args = list(params)
+    if cursor is not None:
+        conditions.append(f"({sort_column}, id) {'>' if backwards else '<'} (?, ?)")
+        args.extend(cursor)
+    order = 'ASC' if backwards else 'DESC'
+    query = select
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {sort_column} {order}, id {order} LIMIT ?"
+    rows = get_connection().execute(query, (*args, limit + 1)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    return rows, more
+
+def get_users_page(limit=20, cursor=None, backwards=False):
+    """Get a page of (username, score, language, last_interaction, id) by last interaction."""
+    return _keyset_page(
+        "SELECT username, score, language, last_interaction, id FROM users",
+        None, (), 'last_interaction', limit, cursor, backwards
+    )
+
+# Archived quizzes keep their id and are all older than the live ones, so
+# both tables page as one. Their texts come back compressed.
+_QUIZZES_WITH_ARCHIVE = """
+    SELECT question, answer, quiz_type, created_at, id FROM (
+        SELECT user_id, question, answer, quiz_type, created_at, id FROM quizzes
+        UNION ALL
+        SELECT a.user_id, q.compressed, t.compressed, a.quiz_type, a.created_at, a.id
+        FROM quiz_archive a
+        LEFT JOIN archived_texts q ON q.text_key = a.question_key
+        LEFT JOIN archived_texts t ON t.text_key = a.answer_key
+    )
+"""
+
+def get_quizzes_page(user_id, limit=5, cursor=None, backwards=False):
+    """Get a page of the user's (question, answer, quiz_type, created_at, id) quiz rows, archived ones included."""
+    rows, more = _keyset_page(
+        _QUIZZES_WITH_ARCHIVE, "user_id = ?", (user_id,), 'created_at', limit, cursor, backwards
+    )
+    rows = [
+        tuple(zlib.decompress(value).decode('utf-8') if isinstance(value, bytes) else value for value in row)
+        for row in rows
+    ]
+    return rows, more
+
+# Days rolled up by retention come after the raw rows, as one row per day
+# dated by the day alone; a user has one row per day, so id 0 still makes
+# the cursor unique
+_SCORE_HISTORY_WITH_DAILY = """
+    SELECT score, timestamp, id FROM (
+        SELECT user_id, score, timestamp, id FROM score_history
+        UNION ALL
+        SELECT user_id, score, day, 0 FROM score_history_daily
+    )
+"""
+
+def get_score_history_page(user_id, limit=10, cursor=None, backwards=False):
+    """Get a page of the user's (score, timestamp, id) history rows, daily rollups included."""
+    return _keyset_page(
+        _SCORE_HISTORY_WITH_DAILY, "user_id = ?", (user_id,), 'timestamp', limit, cursor, backwards
+    )
+
+USER_EXPORT_COLUMNS = ('id', 'username', 'score', 'language', 'last_interaction', 'created_at')
+
+def write_users_csv(f, batch_size=500):
+    """Write every user as CSV to the binary file f, reading in batches by id. Returns the row count."""
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(USER_EXPORT_COLUMNS)
+    conn = get_connection()
+    last_id = 0
+    count = 0
+    while True:
+        # Short queries instead of one long read, so checkpoints are not held up
+        rows = conn.execute(f"""
+            SELECT {', '.join(USER_EXPORT_COLUMNS)} FROM users
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        writer.writerows(rows)
+        count += len(rows)
+        last_id = rows[-1][0]
+    text.flush()
+    text.detach()
+    return count
+
+def get_schedules():
+    """Get (user_id, interval_seconds, difficulty, next_run_at) for every scheduled user."""
+    c = get_connection().execute("""
+        SELECT user_id, interval_seconds, difficulty, next_run_at
+        FROM schedules
+    """)
+    return c.fetchall()
+
+def save_schedule(user_id, interval_seconds, difficulty, next_run_at):
+    """Create or replace a user's quiz schedule."""
+    with transaction() as c:
+        c.execute("""
+            INSERT OR REPLACE INTO schedules (user_id, interval_seconds, difficulty, next_run_at)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, interval_seconds, difficulty, next_run_at))
+
+def delete_schedule(user_id):
+    """Remove a user's quiz schedule."""
+    with transaction() as c:
+        c.execute("DELETE FROM schedules WHERE user_id = ?", (user_id,))
+
+def update_schedule_runs(rows):
+    """Store new next_run_at values from (next_run_at, user_id) rows in one transaction."""
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("UPDATE users SET score = ? WHERE id = ?", (new_score, user_id))
-            c.execute("""
-                INSERT INTO score_history (user_id, score)
-                VALUES (?, ?)
-            """, (user_id, new_score))
-            conn.commit()
+        with transaction() as c:
+            c.executemany("UPDATE schedules SET next_run_at = ? WHERE user_id = ?", rows)
     except sqlite3.Error as e:
-        logging.error(f"Database error in update_user_score: {e}")
+        logging.error(f"Database error in update_schedule_runs: {e}")
 
-def log_quiz_attempt(user_id, question, answer, quiz_type, difficulty):
-    """Log a quiz attempt in the database."""
+def get_active_question(user_id):
+    """Get (question, sent_at) for the user's unanswered question, or None."""
+    c = get_connection().execute("SELECT question, sent_at FROM active_questions WHERE user_id = ?", (user_id,))
+    result = c.fetchone()
+    return (json.loads(result[0]), result[1]) if result else None
+
+def save_active_question(user_id, question, sent_at):
+    """Store the question the user is currently answering, replacing any previous one."""
+    with transaction() as c:
+        c.execute("""
+            INSERT OR REPLACE INTO active_questions (user_id, question, sent_at)
+            VALUES (?, ?, ?)
+        """, (user_id, json.dumps(question), sent_at))
+
+def pop_active_question(user_id, question_id):
+    """Remove and return (question, sent_at) for the user's unanswered question if it is question_id.
+
+    Only one caller ever gets it.
+    """
+    with transaction() as c:
+        c.execute("""
+            DELETE FROM active_questions
+            WHERE user_id = ? AND json_extract(question, '$.question.id') = ?
+            RETURNING question, sent_at
+        """, (user_id, question_id))
+        result = c.fetchone()
+    return (json.loads(result[0]), result[1]) if result else None
+
+def purge_active_questions(sent_before):
+    """Delete unanswered questions sent before the given timestamp."""
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            
-            # Ensure all parameters are strings
-            question = str(question)
-            answer = str(answer)
-            quiz_type = str(quiz_type or 'General')
-            difficulty = str(difficulty or 'unknown')
-            
-            c.execute("""
-                INSERT INTO quizzes (user_id, question, answer, quiz_type, difficulty, created_at)
-                VALUES (?, ?, ?, ?, ?, datetime('now'))
-            """, (user_id, question, answer, quiz_type, difficulty))
-            conn.commit()
-            logging.info(f"Quiz attempt logged for user {user_id}")
+        with transaction() as c:
+            c.execute("DELETE FROM active_questions WHERE sent_at < ?", (sent_before,))
+            return c.rowcount
     except sqlite3.Error as e:
-        logging.error(f"Database error in log_quiz_attempt: {e}")
-        logging.error(f"Failed to log quiz attempt details:")
-        logging.error(f"User ID: {user_id}")
-        logging.error(f"Question: {question}")
-        logging.error(f"Answer: {answer}")
-        logging.error(f"Quiz Type: {quiz_type}")
-        logging.error(f"Difficulty: {difficulty}") 
\ No newline at end of file
+        logging.error(f"Database error in purge_active_questions: {e}")
+        return 0
+
+def get_quiz_difficulty(user_id):
+    c = get_connection().execute("SELECT difficulty FROM quiz_preferences WHERE user_id = ?", (user_id,))
+    result = c.fetchone()
+    return result[0] if result else None
+
+def set_quiz_difficulty(user_id, difficulty):
+    with transaction() as c:
+        c.execute("""
+            INSERT OR REPLACE INTO quiz_preferences (user_id, difficulty) VALUES (?, ?)
+        """, (user_id, difficulty))
+
+def get_projected_seen_questions(user_id):
+    """Get the user's serialized SeenSet, including one that is not yet committed.
+
+    Must run on the writer thread so it cannot interleave with a flush.
+    """
+    pending = write_behind.pending_seen(user_id)
+    return pending if pending is not None else get_seen_questions(user_id)
+
+def get_seen_questions(user_id):
+    """Get the serialized SeenSet of the questions sent to a user, or None."""
+    c = get_connection().execute("SELECT seen FROM seen_questions WHERE user_id = ?", (user_id,))
+    result = c.fetchone()
+    return result[0] if result else None
+
+def question_content_hash(question, answer, incorrect_answers):
+    """Hash identifying a question regardless of case, surrounding spaces or option order."""
+    parts = [question, answer, *sorted(incorrect_answers)]
+    normalized = "\x1f".join(part.strip().lower() for part in parts)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+def bank_row(question):
+    """question_bank column values for a formatted question (see format_question)."""
+    incorrect = [option for option in question['options'] if option != question['answer']]
+    return (
+        question_content_hash(question['question'], question['answer'], incorrect),
+        question['question'],
+        question['answer'],
+        json.dumps(incorrect),
+        question.get('quiz_type'),
+        question.get('difficulty'),
+    )
+
+_INSERT_BANK_QUESTION = """
+    INSERT OR IGNORE INTO question_bank
+        (content_hash, question, answer, incorrect_answers, category, difficulty)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def add_bank_questions(questions):
+    """Add formatted questions to the bank and return their bank ids, reusing the id of duplicates."""
+    ids = []
+    with transaction() as c:
+        for question in questions:
+            row = bank_row(question)
+            c.execute(_INSERT_BANK_QUESTION, row)
+            c.execute("SELECT id FROM question_bank WHERE content_hash = ?", (row[0],))
+            ids.append(c.fetchone()[0])
+    return ids
+
+def import_bank_rows(rows):
+    """Insert bank rows in one transaction, skipping duplicates. Returns the number inserted."""
+    conn = get_connection()
+    before = conn.total_changes
+    with transaction() as c:
+        c.executemany(_INSERT_BANK_QUESTION, rows)
+    return conn.total_changes - before
+
+def get_question_bank_index():
+    """Get (id, difficulty, category) for every banked question."""
+    return get_connection().execute("SELECT id, difficulty, category FROM question_bank").fetchall()
+
+def get_bank_question(question_id):
+    """Get (id, question, answer, incorrect_answers, category, difficulty) for a banked question."""
+    c = get_connection().execute("""
+        SELECT id, question, answer, incorrect_answers, category, difficulty
+        FROM question_bank WHERE id = ?
+    """, (question_id,))
+    return c.fetchone()
+
+def get_cached_translation(text_hash, language):
+    """Get a stored translation, or None if it was never cached."""
+    c = get_connection().execute("""
+        SELECT translated FROM translations
+        WHERE text_hash = ? AND language = ?
+    """, (text_hash, language))
+    result = c.fetchone()
+    return result[0] if result else None
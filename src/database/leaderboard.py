@@ -0,0 +1,130 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+class Leaderboard:
+    """In-memory ranking of users by score.
+
+    Scores are counted in a Fenwick tree indexed by score, so both "how many
+    users score higher than X" and "which score is the k-th highest" are
+    O(log max_score). Users with equal scores share a bucket and a rank;
+    each bucket is kept sorted by user id, so the top n never sorts one.
+    Loaded once from the users table and kept current by the database
+    functions that change scores.
+    """
+
+    def __init__(self, initial_size: int = 1024):
+        self._lock = threading.Lock()
+        self._scores: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+        self._buckets: Dict[int, List[int]] = {}
+        self._size = initial_size
+        self._tree = [0] * (initial_size + 1)
+
+    def __len__(self):
+        return len(self._scores)
+
+    # Fenwick tree indexed by score + 1
+    def _add(self, score: int, delta: int):
+        i = score + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, score: int) -> int:
+        i = min(score + 1, self._size)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _kth_smallest(self, k: int) -> int:
+        position = 0
+        step = 1 << self._size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self._size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return position
+
+    def _grow(self, score: int):
+        size = self._size
+        while score + 1 > size:
+            size *= 2
+        self._size = size
+        self._tree = [0] * (size + 1)
+        for bucket_score, bucket in self._buckets.items():
+            self._add(bucket_score, len(bucket))
+
+    def load(self, rows):
+        """Replace the contents with (user_id, username, score) rows."""
+        with self._lock:
+            self._scores.clear()
+            self._names.clear()
+            self._buckets.clear()
+            for user_id, username, score in rows:
+                score = max(score or 0, 0)
+                self._scores[user_id] = score
+                self._names[user_id] = username
+                self._buckets.setdefault(score, []).append(user_id)
+            # Sort each bucket once rather than inserting in order, then size and fill the tree
+            for bucket in self._buckets.values():
+                bucket.sort()
+            self._grow(max(self._buckets, default=0))
+
+    def update(self, user_id: int, score: int, username: Optional[str] = None):
+        """Record a user's new absolute score."""
+        with self._lock:
+            self._set(user_id, score)
+            if username is not None:
+                self._names[user_id] = username
+
+    def set_username(self, user_id: int, username: str):
+        with self._lock:
+            self._names[user_id] = username
+
+    def _set(self, user_id: int, score: int):
+        # Scores never go below 0 in the bot; clamp so they always have a tree slot
+        score = max(score, 0)
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            bucket = self._buckets[old]
+            del bucket[bisect_left(bucket, user_id)]
+            if not bucket:
+                del self._buckets[old]
+            self._add(old, -1)
+        if score + 1 > self._size:
+            self._grow(score)
+        self._scores[user_id] = score
+        insort(self._buckets.setdefault(score, []), user_id)
+        self._add(score, 1)
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """Return (rank, total users), where rank 1 is the highest score, or None if unknown."""
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            total = len(self._scores)
+            return total - self._count_at_most(score) + 1, total
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Return the top n (username, score) pairs, highest first."""
+        with self._lock:
+            total = len(self._scores)
+            leaders = []
+            k = 1
+            while k <= total and len(leaders) < n:
+                score = self._kth_smallest(total - k + 1)
+                bucket = self._buckets[score]
+                for user_id in bucket[:n - len(leaders)]:
+                    leaders.append((self._names.get(user_id), score))
+                k += len(bucket)
+            return leaders
+
+leaderboard = Leaderboard()
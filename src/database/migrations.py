@@ -0,0 +1,254 @@
+"""
+Versioned schema migrations.
+
+Each migration is a (version, description, steps) entry in MIGRATIONS,
+where steps is a list of SQL statements or callables taking a cursor. The
+highest applied version is kept in the ``schema_version`` table, and every
+pending migration runs in its own transaction, in order.
+"""
+import sqlite3
+import logging
+
+def _column_names(c, table):
+    c.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in c.fetchall()]
+
+def _add_missing_quiz_columns(c):
+    # Databases created before these columns existed still have the old quizzes table
+    column_names = _column_names(c, 'quizzes')
+    if 'difficulty' not in column_names:
+        c.execute("ALTER TABLE quizzes ADD COLUMN difficulty TEXT")
+    if 'is_correct' not in column_names:
+        c.execute("ALTER TABLE quizzes ADD COLUMN is_correct INTEGER")
+
+BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        score INTEGER DEFAULT 0,
+        language TEXT DEFAULT 'en',
+        last_interaction TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quizzes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        question TEXT,
+        answer TEXT,
+        quiz_type TEXT,
+        difficulty TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active',
+        is_correct INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+    _add_missing_quiz_columns,
+    """
+    CREATE TABLE IF NOT EXISTS user_audit (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        old_username TEXT,
+        new_username TEXT,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS translations (
+        text_hash TEXT NOT NULL,
+        language TEXT NOT NULL,
+        translated TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (text_hash, language)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS score_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        score INTEGER,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+]
+
+HISTORY_INDEXES = [
+    # /my_quizzes
+    "CREATE INDEX IF NOT EXISTS idx_quizzes_user_created ON quizzes (user_id, created_at DESC)",
+    # /score_history, covering so rows never have to be fetched from the table
+    "CREATE INDEX IF NOT EXISTS idx_score_history_user_ts ON score_history (user_id, timestamp DESC, score)",
+    # /leaderboard, covering
+    "CREATE INDEX IF NOT EXISTS idx_users_score ON users (score DESC, username)",
+    # /all_users
+    "CREATE INDEX IF NOT EXISTS idx_users_last_interaction ON users (last_interaction DESC)",
+    "ANALYZE",
+]
+
+SCHEDULES = [
+    """
+    CREATE TABLE IF NOT EXISTS schedules (
+        user_id INTEGER PRIMARY KEY,
+        interval_seconds INTEGER NOT NULL,
+        difficulty TEXT,
+        next_run_at REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+]
+
+QUIZ_STATE = [
+    """
+    CREATE TABLE IF NOT EXISTS active_questions (
+        user_id INTEGER PRIMARY KEY,
+        question TEXT NOT NULL,
+        sent_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_preferences (
+        user_id INTEGER PRIMARY KEY,
+        difficulty TEXT
+    )
+    """,
+]
+
+COMPACT_ACTIVE_QUESTIONS = [
+    # Rows hold the old answer/options format; they are short-lived, so drop them
+    "DELETE FROM active_questions",
+    "CREATE INDEX IF NOT EXISTS idx_active_questions_sent_at ON active_questions (sent_at)",
+]
+
+QUESTION_BANK = [
+    """
+    CREATE TABLE IF NOT EXISTS question_bank (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL UNIQUE,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        incorrect_answers TEXT NOT NULL,
+        category TEXT,
+        difficulty TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Also covers loading the (id, difficulty, category) sampling index
+    "CREATE INDEX IF NOT EXISTS idx_question_bank_difficulty_category ON question_bank (difficulty, category)",
+]
+
+SEEN_QUESTIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS seen_questions (
+        user_id INTEGER PRIMARY KEY,
+        seen BLOB NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+]
+
+# Every sort key ends in id, the tie-breaker of the keyset page cursors
+PAGINATION_INDEXES = [
+    "DROP INDEX IF EXISTS idx_quizzes_user_created",
+    "CREATE INDEX IF NOT EXISTS idx_quizzes_user_created_id ON quizzes (user_id, created_at DESC, id DESC)",
+    "DROP INDEX IF EXISTS idx_score_history_user_ts",
+    "CREATE INDEX IF NOT EXISTS idx_score_history_user_ts_id ON score_history (user_id, timestamp DESC, id DESC, score)",
+    "DROP INDEX IF EXISTS idx_users_last_interaction",
+    "CREATE INDEX IF NOT EXISTS idx_users_last_interaction_id ON users (last_interaction DESC, id DESC)",
+    "ANALYZE",
+]
+
+RETENTION = [
+    # One row per user and day for score_history rows past retention
+    """
+    CREATE TABLE IF NOT EXISTS score_history_daily (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        score INTEGER,
+        changes INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
+    """,
+    # Texts of archived quizzes, zlib-compressed and stored once, keyed by hash
+    """
+    CREATE TABLE IF NOT EXISTS archived_texts (
+        text_key INTEGER PRIMARY KEY,
+        compressed BLOB NOT NULL
+    )
+    """,
+    # quizzes rows past retention, keeping their original id
+    """
+    CREATE TABLE IF NOT EXISTS quiz_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        question_key INTEGER,
+        answer_key INTEGER,
+        quiz_type TEXT,
+        difficulty TEXT,
+        is_correct INTEGER,
+        created_at TIMESTAMP
+    )
+    """,
+]
+
+# /my_quizzes and /score_history page through archived rows too
+ARCHIVE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_quiz_archive_user_created_id ON quiz_archive (user_id, created_at DESC, id DESC)",
+]
+
+MIGRATIONS = [
+    (1, "Baseline schema", BASELINE),
+    (2, "Indexes for per-user history and leaderboard queries", HISTORY_INDEXES),
+    (3, "Persisted quiz schedules", SCHEDULES),
+    (4, "Quiz state shared between worker processes", QUIZ_STATE),
+    (5, "Compact active questions with expiry", COMPACT_ACTIVE_QUESTIONS),
+    (6, "Local question bank", QUESTION_BANK),
+    (7, "Per-user seen question sets", SEEN_QUESTIONS),
+    (8, "Indexes for keyset pagination", PAGINATION_INDEXES),
+    (9, "Score history rollups and quiz archive", RETENTION),
+    (10, "Indexes for paging archived history", ARCHIVE_INDEXES),
+]
+
+def get_schema_version(conn):
+    """Return the highest applied migration version, or 0 for a new database."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    result = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return result[0] or 0
+
+def run_migrations(conn, target=None):
+    """Apply every pending migration up to target (default: latest). Returns the resulting version."""
+    version = get_schema_version(conn)
+    for migration_version, description, steps in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        if target is not None and migration_version > target:
+            break
+        logging.info(f"Applying migration {migration_version}: {description}")
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN")
+            for step in steps:
+                if callable(step):
+                    step(c)
+                else:
+                    c.execute(step)
+            c.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (migration_version, description)
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        version = migration_version
+    return version
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class UserProfile:
+    """The per-user fields every handler needs before doing real work."""
+
+    __slots__ = ('user_id', 'username', 'language', 'score', 'loaded_at')
+
+    def __init__(self, user_id, username, language, score):
+        self.user_id = user_id
+        self.username = username
+        self.language = language or 'en'
+        self.score = score or 0
+        self.loaded_at = time.monotonic()
+
+class ProfileCache:
+    """Size-capped cache of UserProfile objects that expire after ``ttl`` seconds.
+
+    Entries are dropped explicitly whenever the stored row changes (language
+    updates, username changes, score resets) so a hit is never stale beyond
+    the TTL for changes made by other processes.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserProfile]:
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is None:
+                return None
+            if time.monotonic() - profile.loaded_at > self.ttl:
+                del self._profiles[user_id]
+                return None
+            self._profiles.move_to_end(user_id)
+            return profile
+
+    def put(self, profile: UserProfile):
+        with self._lock:
+            self._profiles[profile.user_id] = profile
+            self._profiles.move_to_end(profile.user_id)
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._profiles.pop(user_id, None)
@@ -0,0 +1,103 @@
+"""
+Bulk import of Open Trivia Database dumps into the question bank.
+
+Accepts JSON files holding an array of opentdb results, or a full API
+response ({"response_code": 0, "results": [...]}), and JSON Lines files
+(.jsonl / .ndjson) with one result per line. Files are read in chunks and
+inserted in batches, so memory stays flat however large the dump is.
+Questions already in the bank, by content hash, are skipped.
+
+    python -m src.database.question_import dump.json more.jsonl
+"""
+import argparse
+import json
+import logging
+from typing import Dict, Iterator, TextIO
+
+from src.api.quiz_api import format_question
+from src.database.database import bank_row, import_bank_rows, setup_db
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 1000
+
+_decoder = json.JSONDecoder()
+
+def iter_json_array(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """Yield the items of the first JSON array in f without loading the whole file."""
+    buffer = ''
+    while '[' not in buffer:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+    buffer = buffer[buffer.index('[') + 1:]
+    pos = 0
+    eof = False
+    while True:
+        # Skip separators between items
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+def iter_json_lines(f: TextIO) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_dump(path: str) -> Iterator[Dict]:
+    """Yield the opentdb results in a dump file."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            yield from iter_json_lines(f)
+        else:
+            yield from iter_json_array(f)
+
+def import_dump(path: str, batch_size: int = BATCH_SIZE) -> Dict:
+    """Import one dump file. Returns counts of questions read, inserted and skipped as malformed."""
+    read = inserted = malformed = 0
+    batch = []
+    for result in iter_dump(path):
+        read += 1
+        try:
+            batch.append(bank_row(format_question(result)))
+        except (KeyError, TypeError) as e:
+            malformed += 1
+            logging.error(f"Skipping malformed question {read} in {path}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            inserted += import_bank_rows(batch)
+            batch = []
+    if batch:
+        inserted += import_bank_rows(batch)
+    return {'read': read, 'inserted': inserted, 'malformed': malformed}
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    setup_db()
+    for path in args.files:
+        counts = import_dump(path, args.batch_size)
+        logging.info(f"{path}: {counts['read']} read, {counts['inserted']} new, "
+                     f"{counts['read'] - counts['inserted'] - counts['malformed']} duplicates, "
+                     f"{counts['malformed']} malformed")
+
+if __name__ == '__main__':
+    main()
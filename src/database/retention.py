@@ -0,0 +1,179 @@
+"""
+Retention for the append-only score_history and quizzes tables.
+
+score_history rows older than the retention period are folded into one
+score_history_daily row per user and day, keeping the day's last score and
+how many changes it had. Old quizzes rows move to quiz_archive, which keeps
+every column but replaces the question and answer text with keys into
+archived_texts, where each distinct text is stored once, zlib-compressed.
+
+Both tables only ever get appended to, so the rows past retention are
+always a prefix by id. Each batch takes the next ``batch_size`` of them in
+one short write transaction on the writer thread, and the runner sleeps
+between batches so normal writes are never queued behind it for long.
+Freed pages are then returned to the filesystem a few at a time with
+``incremental_vacuum``. A database created before auto_vacuum was enabled
+needs a one-off full VACUUM to switch it over. That rewrites the whole file
+and blocks every write meanwhile, so it is only run on request, ideally
+with the bot stopped:
+
+    python -m src.database.retention --score-history-days 30 --quizzes-days 90
+    python -m src.database.retention --vacuum
+
+/score_history and /my_quizzes read the rollups and the archive alongside
+the live tables.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import zlib
+from typing import Dict
+
+from src.core.constants import RETENTION_SCORE_HISTORY_DAYS, RETENTION_QUIZZES_DAYS, RETENTION_BATCH_SIZE
+from src.database import aio
+from src.database.connection import get_connection, transaction
+from src.database.database import setup_db
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+def text_key(text: str) -> int:
+    """Signed 64-bit key of a text in archived_texts."""
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def _expired_prefix(rows):
+    # Rows start with an "is expired" flag; take them until the first one that is not
+    expired = []
+    for row in rows:
+        if not row[0]:
+            break
+        expired.append(row[1:])
+    return expired
+
+def rollup_score_history_batch(days: int, batch_size: int) -> int:
+    """Fold the oldest score_history rows past retention into daily rollups. Returns rows removed."""
+    with transaction() as c:
+        rows = _expired_prefix(c.execute("""
+            SELECT substr(timestamp, 1, 10) < date('now', ?), id, user_id, score, substr(timestamp, 1, 10)
+            FROM score_history ORDER BY id LIMIT ?
+        """, (f'-{days} days', batch_size)))
+        if not rows:
+            return 0
+        daily: Dict[tuple, list] = {}
+        for _, user_id, score, day in rows:
+            # Rows come in id order, so the last one of a day holds its final score
+            totals = daily.setdefault((user_id, day), [score, 0])
+            totals[0] = score
+            totals[1] += 1
+        c.executemany("""
+            INSERT INTO score_history_daily (user_id, day, score, changes) VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                score = excluded.score,
+                changes = changes + excluded.changes
+        """, [(user_id, day, score, changes) for (user_id, day), (score, changes) in daily.items()])
+        c.execute("DELETE FROM score_history WHERE id <= ?", (rows[-1][0],))
+        return len(rows)
+
+def archive_quizzes_batch(days: int, batch_size: int) -> int:
+    """Move the oldest quizzes rows past retention to quiz_archive. Returns rows moved."""
+    with transaction() as c:
+        rows = _expired_prefix(c.execute("""
+            SELECT substr(created_at, 1, 10) < date('now', ?),
+                id, user_id, question, answer, quiz_type, difficulty, is_correct, created_at
+            FROM quizzes ORDER BY id LIMIT ?
+        """, (f'-{days} days', batch_size)))
+        if not rows:
+            return 0
+        texts = {}
+        archived = []
+        for quiz_id, user_id, question, answer, quiz_type, difficulty, is_correct, created_at in rows:
+            keys = []
+            for text in (question or '', answer or ''):
+                key = text_key(text)
+                texts.setdefault(key, text)
+                keys.append(key)
+            archived.append((quiz_id, user_id, *keys, quiz_type, difficulty, is_correct, created_at))
+        c.executemany(
+            "INSERT OR IGNORE INTO archived_texts (text_key, compressed) VALUES (?, ?)",
+            [(key, zlib.compress(text.encode('utf-8'))) for key, text in texts.items()]
+        )
+        c.executemany("""
+            INSERT OR REPLACE INTO quiz_archive
+                (id, user_id, question_key, answer_key, quiz_type, difficulty, is_correct, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, archived)
+        c.execute("DELETE FROM quizzes WHERE id <= ?", (rows[-1][0],))
+        return len(rows)
+
+def vacuum_step(pages: int) -> int:
+    """Return up to ``pages`` free pages to the filesystem. Returns the free pages left.
+
+    Does nothing on a database that does not use incremental auto_vacuum
+    yet; see ``full_vacuum``.
+    """
+    conn = get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        logging.warning("Database does not use incremental auto_vacuum; free pages are kept until "
+                        "python -m src.database.retention --vacuum is run")
+        return 0
+    # incremental_vacuum only does its work while its rows are being stepped through
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+def full_vacuum():
+    """Rebuild the database file, switching it to incremental auto_vacuum."""
+    conn = get_connection()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+async def run_retention(score_history_days: int, quizzes_days: int, batch_size: int = 500,
+                        pause: float = 0.05, vacuum_pages: int = 256) -> Dict:
+    """Apply retention to both tables in batches, then vacuum. Returns counts of rows affected."""
+    counts = {'score_history': 0, 'quizzes': 0}
+    for table, step, days in (
+        ('score_history', rollup_score_history_batch, score_history_days),
+        ('quizzes', archive_quizzes_batch, quizzes_days),
+    ):
+        while True:
+            done = await aio.run_write(step, days, batch_size)
+            counts[table] += done
+            if done < batch_size:
+                break
+            await asyncio.sleep(pause)
+    if any(counts.values()):
+        while await aio.run_write(vacuum_step, vacuum_pages):
+            await asyncio.sleep(pause)
+    logging.info(f"Retention rolled up {counts['score_history']} score history rows "
+                 f"and archived {counts['quizzes']} quizzes")
+    return counts
+
+async def retention_loop(interval: float, score_history_days: int, quizzes_days: int, batch_size: int):
+    """Run retention every interval seconds."""
+    while True:
+        try:
+            await run_retention(score_history_days, quizzes_days, batch_size)
+        except Exception as e:
+            logging.error(f"Error running retention: {e}")
+        await asyncio.sleep(interval)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--score-history-days', type=int, default=RETENTION_SCORE_HISTORY_DAYS)
+    parser.add_argument('--quizzes-days', type=int, default=RETENTION_QUIZZES_DAYS)
+    parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE)
+    parser.add_argument('--vacuum', action='store_true',
+                        help="rebuild the database with a full VACUUM instead; blocks all writes while it runs")
+    args = parser.parse_args()
+
+    setup_db()
+    if args.vacuum:
+        logging.info("Rebuilding the database with incremental auto_vacuum")
+        full_vacuum()
+        return
+    asyncio.run(run_retention(args.score_history_days, args.quizzes_days, args.batch_size))
+    aio.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Per-user quiz state: the question a user is currently answering and their
+chosen difficulty.
+
+Two interchangeable backends are provided. MemoryStateBackend keeps the
+state in the process and is the default for a single bot process.
+SQLiteStateBackend keeps it in the shared database, so any worker process
+can read it and a user's state survives moving to another shard or a
+restart.
+
+Which questions each user has already been sent is always persisted, as a
+compact SeenSet blob per user, by SeenQuestions.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from src.database import aio
+from src.utils.seen_set import SeenSet
+
+# Fields of a pooled question that are needed to check and log an answer
+QUESTION_FIELDS = ('id', 'question', 'answer', 'options', 'quiz_type', 'difficulty')
+
+class ActiveQuestion:
+    """A question waiting for a user's answer.
+
+    ``question`` is the pooled question dict, shared with every other user
+    who got the same question rather than copied. ``order`` holds the
+    indices into ``question['options']`` in the order the buttons were
+    shown, and ``answer_index`` is the button position of the correct
+    answer, so checking an answer is a single integer comparison.
+    """
+    __slots__ = ('question_id', 'question', 'order', 'answer_index', 'sent_at')
+
+    def __init__(self, question_id: int, question: dict, order: Sequence[int], answer_index: int,
+                 sent_at: Optional[float] = None):
+        self.question_id = question_id
+        self.question = question
+        self.order = bytes(order)
+        self.answer_index = answer_index
+        self.sent_at = time.time() if sent_at is None else sent_at
+
+    def option(self, position: int) -> int:
+        """Index into the question's options of the button at position."""
+        return self.order[position]
+
+    def to_dict(self) -> dict:
+        return {
+            'question': {field: self.question.get(field) for field in QUESTION_FIELDS},
+            'order': list(self.order),
+            'answer_index': self.answer_index,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, sent_at: float) -> 'ActiveQuestion':
+        question = data['question']
+        return cls(question['id'], question, data['order'], data['answer_index'], sent_at)
+
+class MemoryStateBackend:
+    """In-process state with expiry of abandoned questions and a size cap.
+
+    Questions are kept in send order, so the expired ones are always at the
+    front and are dropped as new ones arrive. Past ``max_size`` the oldest
+    question is evicted even if it has not expired.
+    """
+
+    def __init__(self, ttl: float = 21600.0, max_size: int = 100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._active: 'OrderedDict[int, ActiveQuestion]' = OrderedDict()
+        self._difficulty: Dict[int, str] = {}
+
+    def __len__(self):
+        return len(self._active)
+
+    def _expired(self, active: ActiveQuestion, now: float) -> bool:
+        return now - active.sent_at > self.ttl
+
+    def _evict(self, now: float):
+        while self._active:
+            user_id, oldest = next(iter(self._active.items()))
+            if len(self._active) <= self.max_size and not self._expired(oldest, now):
+                break
+            del self._active[user_id]
+
+    async def get_active(self, user_id: int) -> Optional[ActiveQuestion]:
+        active = self._active.get(user_id)
+        if active is not None and self._expired(active, time.time()):
+            del self._active[user_id]
+            return None
+        return active
+
+    async def put_active(self, user_id: int, active: ActiveQuestion):
+        self._active.pop(user_id, None)
+        self._active[user_id] = active
+        self._evict(active.sent_at)
+
+    async def pop_active_if(self, user_id: int, question_id: int) -> Optional[ActiveQuestion]:
+        active = await self.get_active(user_id)
+        if active is None or active.question_id != question_id:
+            return None
+        del self._active[user_id]
+        return active
+
+    async def get_difficulty(self, user_id: int) -> Optional[str]:
+        return self._difficulty.get(user_id)
+
+    async def set_difficulty(self, user_id: int, difficulty: str):
+        self._difficulty[user_id] = difficulty
+
+class SQLiteStateBackend:
+    """State in the active_questions and quiz_preferences tables.
+
+    Expired questions are ignored on read and deleted in bulk at most once
+    per ``ttl``.
+    """
+
+    def __init__(self, ttl: float = 21600.0):
+        self.ttl = ttl
+        self._last_purge = time.time()
+
+    def _live(self, row) -> Optional[ActiveQuestion]:
+        if row is None:
+            return None
+        data, sent_at = row
+        if time.time() - sent_at > self.ttl:
+            return None
+        return ActiveQuestion.from_dict(data, sent_at)
+
+    async def get_active(self, user_id: int) -> Optional[ActiveQuestion]:
+        return self._live(await aio.get_active_question(user_id))
+
+    async def put_active(self, user_id: int, active: ActiveQuestion):
+        await aio.save_active_question(user_id, active.to_dict(), active.sent_at)
+        if active.sent_at - self._last_purge > self.ttl:
+            self._last_purge = active.sent_at
+            await aio.purge_active_questions(active.sent_at - self.ttl)
+
+    async def pop_active_if(self, user_id: int, question_id: int) -> Optional[ActiveQuestion]:
+        return self._live(await aio.pop_active_question(user_id, question_id))
+
+    async def get_difficulty(self, user_id: int) -> Optional[str]:
+        return await aio.get_quiz_difficulty(user_id)
+
+    async def set_difficulty(self, user_id: int, difficulty: str):
+        await aio.set_quiz_difficulty(user_id, difficulty)
+
+class SeenQuestions:
+    """Per-user SeenSets, cached in memory and written behind to seen_questions.
+
+    A user's updates are always handled by the same process, so the cached
+    set is never stale. A changed set is saved with the next write-behind
+    flush, so a user sent several questions between flushes costs one write. The least recently used sets beyond ``max_cached``
+    are dropped and reloaded from the database on the next quiz.
+    """
+
+    def __init__(self, capacity: int = 1000, error_rate: float = 0.01, max_cached: int = 10000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_cached = max_cached
+        self._sets: 'OrderedDict[int, SeenSet]' = OrderedDict()
+
+    async def get(self, user_id: int) -> SeenSet:
+        seen = self._sets.get(user_id)
+        if seen is None:
+            blob = await aio.get_seen_questions(user_id)
+            # Another call may have loaded it meanwhile
+            seen = self._sets.get(user_id) or SeenSet.from_bytes(blob, self.capacity, self.error_rate)
+            self._sets[user_id] = seen
+            while len(self._sets) > self.max_cached:
+                self._sets.popitem(last=False)
+        self._sets.move_to_end(user_id)
+        return seen
+
+    async def add(self, user_id: int, question_id: int):
+        seen = await self.get(user_id)
+        if question_id in seen:
+            return
+        seen.add(question_id)
+        aio.save_seen_questions(user_id, seen.to_bytes())
+
+def create_state_backend(name: str, ttl: float = 21600.0, max_size: int = 100000):
+    """Create the "memory" or "sqlite" backend."""
+    if name == 'memory':
+        return MemoryStateBackend(ttl, max_size)
+    if name == 'sqlite':
+        return SQLiteStateBackend(ttl)
+    raise ValueError(f"Unknown state backend: {name}")
@@ -0,0 +1,98 @@
+"""
+Compact callback_data for inline buttons.
+
+Telegram limits callback_data to 64 bytes, so buttons carry short codes
+instead of text. Every code starts with the protocol version and a
+one-letter action, followed by fixed-width fields:
+
+    1q:<question id, 8 hex digits>:<button position, 1 hex digit>
+    1d:<difficulty>
+    1l:<language code>
+    1p:<view><direction>:<row id, hex>:<sort value>
+    1r:<view>:<version, hex>
+
+Page codes carry the keyset cursor of the row to page on from; direction
+is ">" for older rows and "<" for newer ones. Sort values are timestamps,
+which keeps them well under the limit. Refresh codes carry the version
+of the stats snapshot the message was rendered from.
+
+Answer codes carry the question id, so a click on a button from an older
+question can be told apart from an answer to the current one. Buttons sent
+before this encoding existed are still understood, except answer buttons,
+which have no question id and are treated as stale.
+"""
+from typing import Optional, Tuple
+
+VERSION = '1'
+
+ANSWER = 'q'
+DIFFICULTY = 'd'
+LANGUAGE = 'l'
+PAGE = 'p'
+REFRESH = 'r'
+
+OLDER = '>'
+NEWER = '<'
+
+# Old prefixes mapped to their action
+_LEGACY = (
+    ('difficulty_', DIFFICULTY),
+    ('lang_', LANGUAGE),
+)
+
+def encode_answer(question_id: int, position: int) -> str:
+    return f"{VERSION}{ANSWER}:{question_id:08x}:{position:x}"
+
+def encode_difficulty(difficulty: str) -> str:
+    return f"{VERSION}{DIFFICULTY}:{difficulty}"
+
+def encode_language(code: str) -> str:
+    return f"{VERSION}{LANGUAGE}:{code}"
+
+def encode_page(view: str, direction: str, cursor: Tuple[str, int]) -> str:
+    value, row_id = cursor
+    return f"{VERSION}{PAGE}:{view}{direction}:{row_id:x}:{value}"
+
+def encode_refresh(view: str, version: int) -> str:
+    return f"{VERSION}{REFRESH}:{view}:{version:x}"
+
+def parse(data: Optional[str]) -> Optional[Tuple[str, tuple]]:
+    """Decode callback_data into (action, args), or None if it is malformed or stale.
+
+    Answer args are (question_id, position) as ints and page args are
+    (view, direction, (sort value, row id)) and refresh args are (view,
+    version); the other actions get their value as a single string.
+    """
+    if not data:
+        return None
+    if data[0] == VERSION and data[2:3] == ':':
+        action = data[1]
+        if action == ANSWER:
+            if len(data) != 13 or data[11] != ':':
+                return None
+            try:
+                return ANSWER, (int(data[3:11], 16), int(data[12], 16))
+            except ValueError:
+                return None
+        if action == PAGE:
+            view, direction, cursor = data[3:4], data[4:5], data[6:].split(':', 1)
+            if not view or direction not in (OLDER, NEWER) or data[5:6] != ':' or len(cursor) != 2:
+                return None
+            try:
+                return PAGE, (view, direction, (cursor[1], int(cursor[0], 16)))
+            except ValueError:
+                return None
+        if action == REFRESH:
+            if len(data) < 7 or data[4] != ':':
+                return None
+            try:
+                return REFRESH, (data[3], int(data[5:], 16))
+            except ValueError:
+                return None
+        if action in (DIFFICULTY, LANGUAGE) and len(data) > 3:
+            return action, (data[3:],)
+        return None
+    for prefix, action in _LEGACY:
+        if data.startswith(prefix):
+            return action, (data[len(prefix):],)
+    return None
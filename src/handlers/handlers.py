@@ -2,404 +2,558 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotComm
 from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler, MessageHandler, filters
 from datetime import datetime, timedelta
 import logging
-import sqlite3
 import asyncio
-from src.database.database import (
-    ensure_user_in_db, 
-    get_user_language, 
-    update_user_score,
-    log_quiz_attempt
+import random
+import tempfile
+from src.database.aio import (
+    get_profile,
+    get_user_language,
+    record_answer,
+    get_user_score,
+    set_user_language,
+    reset_user_score,
+    get_user_info,
+    get_users_page,
+    get_quizzes_page,
+    get_score_history_page,
+    write_users_csv
 )
-from src.api.quiz_api import QuizAPI, format_question
-from src.utils.utils import translate_text
-from src.core.constants import LANGUAGES, YOUR_ADMIN_ID, DB_NAME
+from src.utils.utils import translate_ui, translate_template
+from src.handlers import messages, callbacks, paging
+from src.database.database import answer_points
+from src.database.leaderboard import leaderboard
+from src.core.stats import LEADERBOARD_VIEW, STATS_VIEW, RENDERERS, accuracy
+from src.database.state import ActiveQuestion
+from src.core.constants import (
+    LANGUAGES,
+    YOUR_ADMIN_ID,
+    SCHEDULE_INTERVAL,
+    NEXT_QUIZ_DELAY,
+    USERS_PAGE_SIZE,
+    QUIZZES_PAGE_SIZE,
+    SCORE_HISTORY_PAGE_SIZE
+)
+from src.core.outbound import INTERACTIVE
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+DIFFICULTY_EMOJI = {"easy": "🟢", "medium": "🟡", "hard": "🔴"}
+
+async def deliver(context: ContextTypes.DEFAULT_TYPE, chat_id: int, call, priority: int = INTERACTIVE):
+    """Run an outgoing API call through the outbound queue, or directly if there is none.
+
+    ``call`` must return a new coroutine each time, since failed sends are retried.
+    """
+    outbound = context.bot_data.get('outbound')
+    if outbound is None:
+        return await call()
+    return await outbound.send(chat_id, call, priority)
+
+async def reply(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, **kwargs):
+    return await deliver(context, update.effective_chat.id, lambda: update.message.reply_text(text, **kwargs))
+
+async def edit(query, context: ContextTypes.DEFAULT_TYPE, text: str, **kwargs):
+    return await deliver(context, query.message.chat_id, lambda: query.edit_message_text(text=text, **kwargs))
 
-# Store scheduled jobs per user
-user_jobs = {}
+async def send(context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str, priority: int = INTERACTIVE, **kwargs):
+    return await deliver(
+        context, chat_id, lambda: context.bot.send_message(chat_id=chat_id, text=text, **kwargs), priority
+    )
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    welcome_text = translate_text("Welcome to the Quiz Bot\\! Type /help for commands\\.", lang)
-    await update.message.reply_text(welcome_text, parse_mode='MarkdownV2')
+    profile = await get_profile(user)
+    lang = profile.language
+    welcome_text = translate_ui(messages.WELCOME, lang)
+    await reply(update, context, welcome_text, parse_mode='MarkdownV2')
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    help_text = translate_text("""*Available Commands:*
-
-/start \\- Initialize or reset your profile
-/quiz \\- Choose quiz difficulty and start
-/leaderboard \\- See top scorers
-/user\\_info \\- Check your own information
-/all\\_users \\- List all users who have interacted with the bot
-/set\\_language \\- Change the bot's language
-/my\\_quizzes \\- See your quiz history
-/schedule\\_quiz \\- Schedule automatic quizzes
-/stop\\_schedule \\- Stop automatic quizzes
-/score\\_history \\- View your score history
-/my\\_score \\- View your current score
-/reset \\- Reset your score to 0
-/help \\- Show this help message""", get_user_language(user.id))
-    await update.message.reply_text(help_text, parse_mode='MarkdownV2')
+    profile = await get_profile(user)
+    help_text = translate_ui(messages.HELP, profile.language)
+    await reply(update, context, help_text, parse_mode='MarkdownV2')
 
 async def quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
+    profile = await get_profile(user)
+    lang = profile.language
     
     # Show difficulty selection keyboard
     keyboard = [
-        [InlineKeyboardButton("🟢 Easy", callback_data="difficulty_easy")],
-        [InlineKeyboardButton("🟡 Medium", callback_data="difficulty_medium")],
-        [InlineKeyboardButton("🔴 Hard", callback_data="difficulty_hard")]
+        [InlineKeyboardButton(
+            f"{DIFFICULTY_EMOJI[difficulty]} {translate_ui(messages.DIFFICULTY_NAMES[difficulty], lang)}",
+            callback_data=callbacks.encode_difficulty(difficulty)
+        )]
+        for difficulty in DIFFICULTIES
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        translate_text("Choose difficulty level:", lang),
+    await reply(
+        update, context,
+        translate_ui(messages.CHOOSE_DIFFICULTY, lang),
         reply_markup=reply_markup
     )
 
-async def send_quiz(context: ContextTypes.DEFAULT_TYPE, user_id: int, difficulty: str = None):
-    """Send a quiz to the user."""
+def format_question_text(localized: dict, difficulty: str = None) -> str:
+    return f"{DIFFICULTY_EMOJI.get(difficulty, '')} {localized['question']}"
+
+async def send_quiz(context: ContextTypes.DEFAULT_TYPE, user_id: int, difficulty: str = None,
+                    question: dict = None, priority: int = INTERACTIVE):
+    """Send a quiz to the user, drawing one from the question source unless a question is given.
+
+    Questions the user has already been sent are skipped where possible,
+    including a given one.
+    """
     try:
-        lang = get_user_language(user_id)
-        quiz_api = QuizAPI()
-        params = {'amount': 1, 'type': 'multiple'}
-        if difficulty:
-            params['difficulty'] = difficulty
+        pool = context.bot_data['question_source']
+        seen_questions = context.bot_data['seen_questions']
+        lang = await get_user_language(user_id)
+        seen = await seen_questions.get(user_id)
+        formatted_q = question if question and question['id'] not in seen else None
+        formatted_q = formatted_q or await pool.get(difficulty, seen=seen)
         
-        question_data = await quiz_api.get_question(params)
-        await quiz_api.close()
-        
-        if not question_data:
-            error_msg = translate_text("Sorry, I couldn't fetch a question right now. Please try again later.", lang)
-            await context.bot.send_message(chat_id=user_id, text=error_msg)
+        if not formatted_q:
+            error_msg = translate_ui(messages.FETCH_FAILED, lang)
+            await send(context, user_id, error_msg, priority)
             return
         
-        formatted_q = format_question(question_data)
+        # Questions are normally localized at prefetch time; this only
+        # translates when the prefetch for this language has not finished.
+        localized = await pool.localize(formatted_q, lang)
+        # Every user gets their own button order; only the order and the
+        # position of the correct answer are kept
+        order = list(range(len(formatted_q['options'])))
+        random.shuffle(order)
+        answer_index = order.index(formatted_q['options'].index(formatted_q['answer']))
         keyboard = []
-        for option in formatted_q['options']:
-            keyboard.append([InlineKeyboardButton(option, callback_data=f"quiz_{option}")])
+        for position, option in enumerate(order):
+            keyboard.append([InlineKeyboardButton(
+                localized['options'][option],
+                callback_data=callbacks.encode_answer(formatted_q['id'], position)
+            )])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        difficulty_emoji = {"easy": "🟢", "medium": "🟡", "hard": "🔴"}.get(difficulty, "")
-        question_text = f"{difficulty_emoji} {translate_text(formatted_q['question'], lang)}"
-        
-        # Store both question and answer in user data
-        if not hasattr(context, 'user_data'):
-            context.user_data = {}
-        context.user_data[f'current_answer_{user_id}'] = formatted_q['answer']
-        context.user_data[f'current_question_{user_id}'] = question_text
+        question_text = format_question_text(localized, formatted_q.get('difficulty'))
         
-        await context.bot.send_message(
-            chat_id=user_id,
-            text=question_text,
-            reply_markup=reply_markup
+        await context.bot_data['state'].put_active(
+            user_id, ActiveQuestion(formatted_q['id'], formatted_q, order, answer_index)
         )
+        await seen_questions.add(user_id, formatted_q['id'])
+        
+        await send(context, user_id, question_text, priority, reply_markup=reply_markup)
     except Exception as e:
         logging.error(f"Error sending quiz: {e}")
 
+def schedule_next_quiz(context: ContextTypes.DEFAULT_TYPE, user_id: int, difficulty: str = None,
+                       delay: float = NEXT_QUIZ_DELAY):
+    """Send the user's next question after delay seconds, replacing any already pending."""
+    pending = context.bot_data.setdefault('next_quiz', {})
+    cancel_next_quiz(context, user_id)
+
+    def fire():
+        pending.pop(user_id, None)
+        task = asyncio.create_task(send_quiz(context, user_id, difficulty))
+        # Keep a reference until the task finishes so it is not garbage collected
+        tasks = context.bot_data.setdefault('next_quiz_tasks', set())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    pending[user_id] = asyncio.get_running_loop().call_later(delay, fire)
+
+def cancel_next_quiz(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
+    """Cancel the user's pending next question, if any."""
+    handle = context.bot_data.get('next_quiz', {}).pop(user_id, None)
+    if handle is None:
+        return False
+    handle.cancel()
+    return True
+
+def cancel_pending_quizzes(application):
+    """Cancel every pending next question, e.g. on shutdown."""
+    pending = application.bot_data.get('next_quiz', {})
+    for handle in pending.values():
+        handle.cancel()
+    pending.clear()
+
 async def schedule_quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    # Cancel existing job if any
-    if user.id in user_jobs:
-        user_jobs[user.id].schedule_removal()
-    
-    # Schedule new quiz every 30 minutes
-    job = context.job_queue.run_repeating(
-        lambda ctx: send_quiz(ctx, user.id),
-        interval=1800,  # 30 minutes
-        first=5  # First quiz after 5 seconds
+    profile = await get_profile(user)
+    lang = profile.language
+    
+    # Replaces any existing schedule; first quiz after 5 seconds
+    await context.bot_data['scheduler'].add(
+        user.id,
+        SCHEDULE_INTERVAL,
+        difficulty=await context.bot_data['state'].get_difficulty(user.id),
+        first_delay=5
     )
-    user_jobs[user.id] = job
     
-    await update.message.reply_text(
-        translate_text("✅ Automatic quizzes scheduled! You'll receive a new question every 30 minutes.", lang)
+    await reply(
+        update, context,
+        translate_template(messages.SCHEDULE_STARTED, lang, SCHEDULE_INTERVAL // 60)
     )
 
 async def stop_schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
+    profile = await get_profile(user)
+    lang = profile.language
     
-    if user.id in user_jobs:
-        user_jobs[user.id].schedule_removal()
-        del user_jobs[user.id]
-        await update.message.reply_text(
-            translate_text("✅ Automatic quizzes stopped.", lang)
+    if await context.bot_data['scheduler'].remove(user.id):
+        await reply(
+            update, context,
+            translate_ui(messages.SCHEDULE_STOPPED, lang)
         )
     else:
-        await update.message.reply_text(
-            translate_text("❌ No scheduled quizzes found.", lang)
+        await reply(
+            update, context,
+            translate_ui(messages.NO_SCHEDULE, lang)
         )
 
+def refresh_keyboard(view: str, version: int, lang: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(translate_ui(messages.REFRESH, lang), callback_data=callbacks.encode_refresh(view, version))
+    ]])
+
 async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT username, score 
-            FROM users 
-            ORDER BY score DESC 
-            LIMIT 10
-        """)
-        leaders = c.fetchall()
+    profile = await get_profile(user)
+    lang = profile.language
     
-    if not leaders:
-        await update.message.reply_text(translate_text("No scores yet!", lang))
+    stats = context.bot_data['stats']
+    if not stats.leaders:
+        await reply(update, context, translate_ui(messages.NO_SCORES, lang))
         return
     
-    leaderboard_text = "*🏆 Leaderboard 🏆*\n\n"
-    for i, (username, score) in enumerate(leaders, 1):
-        leaderboard_text += f"{i}. {username}: {score} points\n"
-    
-    await update.message.reply_text(leaderboard_text, parse_mode='Markdown')
+    await reply(
+        update, context,
+        stats.render(LEADERBOARD_VIEW, lang),
+        parse_mode='Markdown',
+        reply_markup=refresh_keyboard(LEADERBOARD_VIEW, stats.version, lang)
+    )
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    profile = await get_profile(user)
+    lang = profile.language
+    
+    stats = context.bot_data['stats']
+    await reply(
+        update, context,
+        stats.render(STATS_VIEW, lang),
+        parse_mode='Markdown',
+        reply_markup=refresh_keyboard(STATS_VIEW, stats.version, lang)
+    )
+
+async def refresh_callback(query, context: ContextTypes.DEFAULT_TYPE, lang: str, view: str, version: int):
+    stats = context.bot_data['stats']
+    if view not in RENDERERS:
+        await query.answer()
+        return
+    # The message already shows this version; nothing to render or edit
+    if version == stats.version:
+        await query.answer(translate_ui(messages.STATS_UNCHANGED, lang))
+        return
+    await edit(
+        query, context,
+        stats.render(view, lang),
+        parse_mode='Markdown',
+        reply_markup=refresh_keyboard(view, stats.version, lang)
+    )
 
 async def user_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
+    profile = await get_profile(user)
+    lang = profile.language
     
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT username, score, language, created_at 
-            FROM users 
-            WHERE id = ?
-        """, (user.id,))
-        user_data = c.fetchone()
+    user_data = await get_user_info(user.id)
     
     if not user_data:
-        await update.message.reply_text(translate_text("User information not found.", lang))
+        await reply(update, context, translate_ui(messages.USER_NOT_FOUND, lang))
         return
     
     username, score, language, created_at = user_data
-    info_text = translate_text(f"""*Your Information:*
-Username: {username}
-Score: {score}
-Language: {LANGUAGES.get(language, language)}
-Member since: {created_at}""", lang)
+    info_text = translate_template(
+        messages.USER_INFO, lang,
+        username, score, LANGUAGES.get(language, language), created_at
+    )
+    answered, correct = context.bot_data['stats'].user_totals(user.id)
+    if answered:
+        info_text += "\n" + translate_template(
+            messages.USER_ACCURACY, lang, answered, accuracy(answered, correct)
+        )
     
-    await update.message.reply_text(info_text, parse_mode='Markdown')
+    await reply(update, context, info_text, parse_mode='Markdown')
 
 async def set_language_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    profile = await get_profile(update.effective_user)
     keyboard = []
     for lang_code, lang_name in LANGUAGES.items():
-        keyboard.append([InlineKeyboardButton(lang_name, callback_data=f"lang_{lang_code}")])
+        keyboard.append([InlineKeyboardButton(lang_name, callback_data=callbacks.encode_language(lang_code))])
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Choose your language:", reply_markup=reply_markup)
+    await reply(update, context, translate_ui(messages.CHOOSE_LANGUAGE, profile.language), reply_markup=reply_markup)
 
 async def my_score_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
+    profile = await get_profile(user)
+    lang = profile.language
     
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("SELECT score FROM users WHERE id = ?", (user.id,))
-        score = c.fetchone()[0]
+    score = await get_user_score(user.id)
     
-    score_text = translate_text(f"Your current score is: {score} points", lang)
-    await update.message.reply_text(score_text)
+    score_text = translate_template(messages.CURRENT_SCORE, lang, score)
+    rank = leaderboard.rank(user.id)
+    if rank:
+        score_text += "\n" + translate_template(messages.CURRENT_RANK, lang, *rank)
+    await reply(update, context, score_text)
 
 async def reset_score_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
+    profile = await get_profile(user)
+    lang = profile.language
     
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("UPDATE users SET score = 0 WHERE id = ?", (user.id,))
-        conn.commit()
+    await reset_user_score(user.id)
     
-    reset_text = translate_text("Your score has been reset to 0.", lang)
-    await update.message.reply_text(reset_text)
+    reset_text = translate_ui(messages.SCORE_RESET, lang)
+    await reply(update, context, reset_text)
 
-async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
+async def difficulty_callback(query, context: ContextTypes.DEFAULT_TYPE, lang: str, difficulty: str):
     user = query.from_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    if query.data.startswith('difficulty_'):
-        difficulty = query.data.split('_')[1]
-        context.user_data[f'difficulty_{user.id}'] = difficulty  # Store user's difficulty preference
-        await query.edit_message_text(
-            translate_text(f"Selected difficulty: {difficulty.capitalize()}\nFetching question...", lang)
-        )
-        await send_quiz(context, user.id, difficulty)
+    if difficulty not in DIFFICULTIES:
+        await query.answer()
+        return
+    await context.bot_data['state'].set_difficulty(user.id, difficulty)  # Store user's difficulty preference
+    cancel_next_quiz(context, user.id)
+    await edit(
+        query, context,
+        translate_template(messages.SELECTED_DIFFICULTY, lang, translate_ui(messages.DIFFICULTY_NAMES[difficulty], lang))
+    )
+    await send_quiz(context, user.id, difficulty)
+
+async def answer_callback(query, context: ContextTypes.DEFAULT_TYPE, lang: str, question_id: int, index: int):
+    user = query.from_user
+    state = context.bot_data['state']
+    # A button from an older message leaves the current question untouched
+    active = await state.get_active(user.id)
+    if active is not None and active.question_id == question_id and index < len(active.order):
+        # Taking the question out makes it single-use, so a double click or a
+        # click on an already answered question is ignored
+        active = await state.pop_active_if(user.id, question_id)
+    else:
+        active = None
+    if active is None:
+        await query.answer(translate_ui(messages.QUESTION_EXPIRED, lang))
+        return
+    is_correct = index == active.answer_index
+    
+    question = active.question
+    # Score and label the answer at the question's own level, which may
+    # differ from the user's current preference
+    difficulty = question.get('difficulty')
+    localized = await context.bot_data['question_source'].localize(question, lang)
+    display_options = localized['options']
+    current_question = format_question_text(localized, difficulty)
+    
+    # Log the attempt and award points in one write
+    new_score = await record_answer(
+        user.id,
+        current_question,
+        question['answer'],
+        question.get('quiz_type') or "General",
+        difficulty,
+        is_correct
+    )
     
-    elif query.data.startswith('quiz_'):
-        user_answer = query.data[5:]
-        correct_answer = context.user_data.get(f'current_answer_{user.id}')
-        current_question = context.user_data.get(f'current_question_{user.id}')
-        difficulty = context.user_data.get(f'difficulty_{user.id}')
-        
-        # Log the quiz attempt
-        log_quiz_attempt(
-            user.id,
-            current_question,
-            correct_answer,
-            "General",  # You can update this if you track categories
-            difficulty
-        )
-        
-        # Prepare the response message
-        response_parts = []
-        response_parts.append(f"*Question:*\n{current_question}")
-        response_parts.append(f"\n*Your answer:* {user_answer}")
-        response_parts.append(f"*Correct answer:* {correct_answer}")
-        
-        if user_answer == correct_answer:
-            # Get current score and update it
-            with sqlite3.connect(DB_NAME) as conn:
-                c = conn.cursor()
-                c.execute("SELECT score FROM users WHERE id = ?", (user.id,))
-                current_score = c.fetchone()[0]
-                new_score = current_score + 1
-            
-            # Update score and log in history
-            update_user_score(user.id, new_score)
-            response_parts.append(f"\n✅ *Correct!* You earned a point!\nTotal score: {new_score}")
+    # Prepare the response message
+    response_parts = []
+    response_parts.append(translate_template(messages.ANSWER_QUESTION, lang, current_question))
+    response_parts.append("\n" + translate_template(messages.ANSWER_GIVEN, lang, display_options[active.option(index)]))
+    response_parts.append(translate_template(
+        messages.ANSWER_EXPECTED, lang, display_options[active.option(active.answer_index)]
+    ))
+    
+    if is_correct:
+        points = answer_points(difficulty, True)
+        if new_score is None:
+            if points:
+                logging.error(f"No score row updated for user {user.id} after a correct answer")
+            earned = translate_ui(messages.ANSWER_CORRECT, lang)
+        elif points == 1:
+            earned = translate_template(messages.ANSWER_CORRECT_ONE, lang, new_score)
         else:
-            response_parts.append("\n❌ *Wrong!*")
-        
-        # Show the complete response
-        await query.edit_message_text(
-            text="\n".join(response_parts),
-            parse_mode='Markdown'
-        )
-        
-        # Wait 3 seconds before sending the next question
-        await asyncio.sleep(3)
-        
-        # Send next question with same difficulty
-        difficulty = context.user_data.get(f'difficulty_{user.id}')
-        await send_quiz(context, user.id, difficulty)
+            earned = translate_template(messages.ANSWER_CORRECT_MANY, lang, points, new_score)
+        response_parts.append("\n" + earned)
+    else:
+        response_parts.append("\n" + translate_ui(messages.ANSWER_WRONG, lang))
     
-    elif query.data.startswith('lang_'):
-        new_lang = query.data[5:]
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("UPDATE users SET language = ? WHERE id = ?", (new_lang, user.id))
-            conn.commit()
-        
-        response = translate_text("Language updated successfully!", new_lang)
-        await query.edit_message_text(text=response)
+    # Show the complete response
+    await edit(query, context, "\n".join(response_parts), parse_mode='Markdown')
+    
+    # Send the next question at the user's chosen difficulty after a short
+    # pause, without holding up this handler
+    schedule_next_quiz(context, user.id, await state.get_difficulty(user.id))
+
+async def language_callback(query, context: ContextTypes.DEFAULT_TYPE, lang: str, new_lang: str):
+    if new_lang not in LANGUAGES:
+        await query.answer()
+        return
+    await set_user_language(query.from_user.id, new_lang)
+    
+    response = translate_ui(messages.LANGUAGE_UPDATED, new_lang)
+    await edit(query, context, response)
+
+def format_user_entry(row, lang: str) -> str:
+    username, score, language, last_interaction = row[:4]
+    return translate_template(
+        messages.USER_ENTRY, lang, username, score, LANGUAGES.get(language, language), last_interaction
+    ) + "\n\n"
+
+def format_quiz_entry(row, lang: str) -> str:
+    question, answer, quiz_type, created_at = row[:4]
+    return translate_template(messages.QUIZ_ENTRY, lang, question, answer, quiz_type, created_at) + "\n\n"
+
+def format_score_entry(row, lang: str) -> str:
+    score, timestamp = row[:2]
+    return translate_template(messages.SCORE_ENTRY, lang, score, timestamp) + "\n\n"
+
+# view: (title, fetch(user_id, cursor, backwards), format_entry(row, lang))
+PAGED_VIEWS = {
+    paging.USERS: (
+        messages.USERS_TITLE,
+        lambda user_id, cursor, backwards: get_users_page(USERS_PAGE_SIZE, cursor, backwards),
+        format_user_entry,
+    ),
+    paging.QUIZZES: (
+        messages.QUIZZES_TITLE,
+        lambda user_id, cursor, backwards: get_quizzes_page(user_id, QUIZZES_PAGE_SIZE, cursor, backwards),
+        format_quiz_entry,
+    ),
+    paging.SCORE_HISTORY: (
+        messages.SCORE_HISTORY_TITLE,
+        lambda user_id, cursor, backwards: get_score_history_page(
+            user_id, SCORE_HISTORY_PAGE_SIZE, cursor, backwards
+        ),
+        format_score_entry,
+    ),
+}
+
+async def send_page(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int, view: str, lang: str,
+                    direction: str = None, cursor: tuple = None, query=None) -> bool:
+    """Send one page of a view, editing the message of ``query`` if given.
+
+    Returns False if the page is empty.
+    """
+    title, fetch, format_entry = PAGED_VIEWS[view]
+    rows, more = await fetch(user_id, cursor, direction == callbacks.NEWER)
+    if not rows:
+        return False
+    keyboard = paging.page_keyboard(view, rows, more, direction, lang)
+    # The buttons go on the last message of the page
+    header = translate_ui(title, lang) + "\n\n"
+    texts = list(paging.split_message((format_entry(row, lang) for row in rows), header))
+    for index, text in enumerate(texts):
+        markup = keyboard if index == len(texts) - 1 else None
+        if index == 0 and query is not None:
+            await edit(query, context, text, parse_mode='Markdown', reply_markup=markup)
+        else:
+            await send(context, chat_id, text, parse_mode='Markdown', reply_markup=markup)
+    return True
+
+async def page_callback(query, context: ContextTypes.DEFAULT_TYPE, lang: str, view: str, direction: str,
+                        cursor: tuple):
+    if view not in PAGED_VIEWS:
+        await query.answer()
+        return
+    if view == paging.USERS and query.from_user.id != YOUR_ADMIN_ID:
+        await query.answer(translate_ui(messages.ADMIN_ONLY, lang))
+        return
+    if not await send_page(context, query.message.chat_id, query.from_user.id, view, lang, direction, cursor, query):
+        await query.answer()
+
+CALLBACK_HANDLERS = {
+    callbacks.ANSWER: answer_callback,
+    callbacks.DIFFICULTY: difficulty_callback,
+    callbacks.LANGUAGE: language_callback,
+    callbacks.PAGE: page_callback,
+    callbacks.REFRESH: refresh_callback,
+}
+
+async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    parsed = callbacks.parse(query.data)
+    if parsed is None:
+        await query.answer()
+        return
+    action, args = parsed
+    profile = await get_profile(query.from_user)
+    await CALLBACK_HANDLERS[action](query, context, profile.language, *args)
 
 async def all_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """List all users who have interacted with the bot."""
+    """List the users who have interacted with the bot, most recent first, a page at a time."""
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    # Debug logging for admin ID
-    logging.info(f"User ID: {user.id}, Type: {type(user.id)}")
-    logging.info(f"Admin ID: {YOUR_ADMIN_ID}, Type: {type(YOUR_ADMIN_ID)}")
+    profile = await get_profile(user)
+    lang = profile.language
     
     # Only admin can see all users
     if user.id != YOUR_ADMIN_ID:
-        await update.message.reply_text(
-            translate_text("❌ This command is only available to administrators.", lang)
+        await reply(
+            update, context,
+            translate_ui(messages.ADMIN_ONLY, lang)
         )
         return
     
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT username, score, language, last_interaction
-            FROM users
-            ORDER BY last_interaction DESC
-        """)
-        users = c.fetchall()
+    if not await send_page(context, update.effective_chat.id, user.id, paging.USERS, lang):
+        await reply(update, context, translate_ui(messages.NO_USERS, lang))
+
+async def export_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send the admin every user as a CSV document."""
+    user = update.effective_user
+    profile = await get_profile(user)
+    lang = profile.language
     
-    if not users:
-        await update.message.reply_text(translate_text("No users found.", lang))
+    if user.id != YOUR_ADMIN_ID:
+        await reply(
+            update, context,
+            translate_ui(messages.ADMIN_ONLY, lang)
+        )
         return
     
-    users_text = "*👥 All Users:*\n\n"
-    for username, score, language, last_interaction in users:
-        users_text += f"*{username}*\n"
-        users_text += f"Score: {score}\n"
-        users_text += f"Language: {LANGUAGES.get(language, language)}\n"
-        users_text += f"Last seen: {last_interaction}\n\n"
-    
-    await update.message.reply_text(users_text, parse_mode='Markdown')
+    chat_id = update.effective_chat.id
+    # Rows are written to disk in batches rather than collected in memory
+    with tempfile.TemporaryFile() as f:
+        count = await write_users_csv(f)
+        if not count:
+            await reply(update, context, translate_ui(messages.NO_USERS, lang))
+            return
+        
+        def upload():
+            f.seek(0)
+            return context.bot.send_document(
+                chat_id=chat_id, document=f, filename='users.csv', caption=translate_template(messages.USERS_EXPORTED, lang, count)
+            )
+        
+        await deliver(context, chat_id, upload)
 
 async def my_quizzes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show user's quiz history."""
+    """Show user's quiz history, newest first, a page at a time."""
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    logging.info(f"Fetching quizzes for user {user.id}")
-    
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT question, answer, quiz_type, created_at
-            FROM quizzes
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-            LIMIT 5
-        """, (user.id,))
-        quizzes = c.fetchall()
+    profile = await get_profile(user)
+    lang = profile.language
     
-    logging.info(f"Found {len(quizzes)} quizzes for user {user.id}")
-    
-    if not quizzes:
+    if not await send_page(context, update.effective_chat.id, user.id, paging.QUIZZES, lang):
         logging.warning(f"No quizzes found for user {user.id}")
-        await update.message.reply_text(
-            translate_text("You haven't taken any quizzes yet!", lang)
+        await reply(
+            update, context,
+            translate_ui(messages.NO_QUIZZES, lang)
         )
-        return
-    
-    history_text = "*📚 Your Recent Quizzes:*\n\n"
-    for question, answer, quiz_type, created_at in quizzes:
-        history_text += f"*Question:* {question}\n"
-        history_text += f"*Answer:* {answer}\n"
-        history_text += f"*Category:* {quiz_type}\n"
-        history_text += f"*Date:* {created_at}\n\n"
-    
-    await update.message.reply_text(history_text, parse_mode='Markdown')
 
 async def score_history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show user's score history."""
+    """Show user's score history, newest first, a page at a time."""
     user = update.effective_user
-    ensure_user_in_db(user)
-    lang = get_user_language(user.id)
-    
-    with sqlite3.connect(DB_NAME) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT score, timestamp
-            FROM score_history
-            WHERE user_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 10
-        """, (user.id,))
-        scores = c.fetchall()
+    profile = await get_profile(user)
+    lang = profile.language
     
-    if not scores:
-        await update.message.reply_text(
-            translate_text("No score history available yet!", lang)
+    if not await send_page(context, update.effective_chat.id, user.id, paging.SCORE_HISTORY, lang):
+        await reply(
+            update, context,
+            translate_ui(messages.NO_SCORE_HISTORY, lang)
         )
-        return
-    
-    history_text = "*📈 Your Score History:*\n\n"
-    for score, timestamp in scores:
-        history_text += f"Score: {score} points\n"
-        history_text += f"Date: {timestamp}\n\n"
-    
-    await update.message.reply_text(history_text, parse_mode='Markdown')
 
 def setup_handlers(application):
     """Register all handlers with the application."""
@@ -408,6 +562,7 @@ def setup_handlers(application):
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("quiz", quiz_command))
     application.add_handler(CommandHandler("leaderboard", leaderboard_command))
+    application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("user_info", user_info_command))
     application.add_handler(CommandHandler("set_language", set_language_command))
     application.add_handler(CommandHandler("my_score", my_score_command))
@@ -415,6 +570,7 @@ def setup_handlers(application):
     application.add_handler(CommandHandler("schedule_quiz", schedule_quiz_command))
     application.add_handler(CommandHandler("stop_schedule", stop_schedule_command))
     application.add_handler(CommandHandler("all_users", all_users_command))
+    application.add_handler(CommandHandler("export_users", export_users_command))
     application.add_handler(CommandHandler("myquizzes", my_quizzes_command))
     application.add_handler(CommandHandler("my_quizzes", my_quizzes_command))
     application.add_handler(CommandHandler("score_history", score_history_command))
@@ -0,0 +1,143 @@
+"""
+Static UI strings shown by the handlers.
+
+Every string here is written in English and looked up per user in the
+translation catalogs under ``src/locale``, keyed by its English text.
+Templates use positional ``{0}`` fields and are filled in after the lookup.
+Check the catalogs after adding or changing a string:
+
+    python -m src.utils.catalog
+"""
+
+WELCOME = "Welcome to the Quiz Bot\\! Type /help for commands\\."
+
+HELP = """*Available Commands:*
+
+/start \\- Initialize or reset your profile
+/quiz \\- Choose quiz difficulty and start
+/leaderboard \\- See top scorers
+/stats \\- See answer statistics
+/user\\_info \\- Check your own information
+/all\\_users \\- List all users who have interacted with the bot
+/export\\_users \\- Download all users as CSV
+/set\\_language \\- Change the bot's language
+/my\\_quizzes \\- See your quiz history
+/schedule\\_quiz \\- Schedule automatic quizzes
+/stop\\_schedule \\- Stop automatic quizzes
+/score\\_history \\- View your score history
+/my\\_score \\- View your current score
+/reset \\- Reset your score to 0
+/help \\- Show this help message"""
+
+CHOOSE_DIFFICULTY = "Choose difficulty level:"
+FETCH_FAILED = "Sorry, I couldn't fetch a question right now. Please try again later."
+SCHEDULE_STARTED = "✅ Automatic quizzes scheduled! You'll receive a new question every {0} minutes."
+SCHEDULE_STOPPED = "✅ Automatic quizzes stopped."
+NO_SCHEDULE = "❌ No scheduled quizzes found."
+NO_SCORES = "No scores yet!"
+USER_NOT_FOUND = "User information not found."
+USER_INFO = """*Your Information:*
+Username: {0}
+Score: {1}
+Language: {2}
+Member since: {3}"""
+CURRENT_SCORE = "Your current score is: {0} points"
+CURRENT_RANK = "Your rank is #{0} of {1}"
+SCORE_RESET = "Your score has been reset to 0."
+SELECTED_DIFFICULTY = "Selected difficulty: {0}\nFetching question..."
+LANGUAGE_UPDATED = "Language updated successfully!"
+ADMIN_ONLY = "❌ This command is only available to administrators."
+NO_USERS = "No users found."
+NO_QUIZZES = "You haven't taken any quizzes yet!"
+NO_SCORE_HISTORY = "No score history available yet!"
+QUESTION_EXPIRED = "This question is no longer active."
+LEADERBOARD_TITLE = "🏆 Leaderboard 🏆"
+LEADERBOARD_ENTRY = "{0}. {1}: {2} points"
+STATS_TITLE = "📊 Statistics"
+STATS_TOTALS = """Players: {0}
+Questions answered: {1}
+Accuracy: {2}%"""
+STATS_DIFFICULTY = "{0}: {1}% correct of {2}"
+USER_ACCURACY = "Questions answered: {0}\nAccuracy: {1}%"
+STATS_UNCHANGED = "Already up to date."
+CHOOSE_LANGUAGE = "Choose your language:"
+EASY = "Easy"
+MEDIUM = "Medium"
+HARD = "Hard"
+ANSWER_QUESTION = "*Question:*\n{0}"
+ANSWER_GIVEN = "*Your answer:* {0}"
+ANSWER_EXPECTED = "*Correct answer:* {0}"
+ANSWER_CORRECT_ONE = "✅ *Correct!* You earned a point!\nTotal score: {0}"
+ANSWER_CORRECT_MANY = "✅ *Correct!* You earned {0} points!\nTotal score: {1}"
+ANSWER_CORRECT = "✅ *Correct!*"
+ANSWER_WRONG = "❌ *Wrong!*"
+REFRESH = "🔄 Refresh"
+PAGE_PREV = "⬅️ Prev"
+PAGE_NEXT = "Next ➡️"
+USERS_TITLE = "*👥 All Users:*"
+QUIZZES_TITLE = "*📚 Your Recent Quizzes:*"
+SCORE_HISTORY_TITLE = "*📈 Your Score History:*"
+USER_ENTRY = """*{0}*
+Score: {1}
+Language: {2}
+Last seen: {3}"""
+QUIZ_ENTRY = """*Question:* {0}
+*Answer:* {1}
+*Category:* {2}
+*Date:* {3}"""
+SCORE_ENTRY = "Score: {0} points\nDate: {1}"
+USERS_EXPORTED = "{0} users"
+
+DIFFICULTY_NAMES = {'easy': EASY, 'medium': MEDIUM, 'hard': HARD}
+
+# Everything above; every catalog should translate all of them
+UI_STRINGS = (
+    WELCOME,
+    HELP,
+    CHOOSE_DIFFICULTY,
+    FETCH_FAILED,
+    SCHEDULE_STARTED,
+    SCHEDULE_STOPPED,
+    NO_SCHEDULE,
+    NO_SCORES,
+    USER_NOT_FOUND,
+    USER_INFO,
+    CURRENT_SCORE,
+    CURRENT_RANK,
+    SCORE_RESET,
+    SELECTED_DIFFICULTY,
+    LANGUAGE_UPDATED,
+    ADMIN_ONLY,
+    NO_USERS,
+    NO_QUIZZES,
+    NO_SCORE_HISTORY,
+    QUESTION_EXPIRED,
+    LEADERBOARD_TITLE,
+    LEADERBOARD_ENTRY,
+    STATS_TITLE,
+    STATS_TOTALS,
+    STATS_DIFFICULTY,
+    USER_ACCURACY,
+    STATS_UNCHANGED,
+    CHOOSE_LANGUAGE,
+    EASY,
+    MEDIUM,
+    HARD,
+    ANSWER_QUESTION,
+    ANSWER_GIVEN,
+    ANSWER_EXPECTED,
+    ANSWER_CORRECT_ONE,
+    ANSWER_CORRECT_MANY,
+    ANSWER_CORRECT,
+    ANSWER_WRONG,
+    REFRESH,
+    PAGE_PREV,
+    PAGE_NEXT,
+    USERS_TITLE,
+    QUIZZES_TITLE,
+    SCORE_HISTORY_TITLE,
+    USER_ENTRY,
+    QUIZ_ENTRY,
+    SCORE_ENTRY,
+    USERS_EXPORTED,
+)
@@ -0,0 +1,56 @@
+"""
+Paged list views: splitting long output into messages and the prev/next
+buttons that carry keyset cursors.
+"""
+from typing import Iterable, Iterator, List, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.handlers import callbacks, messages
+from src.utils.utils import translate_ui
+
+# Telegram's limit on the text of one message
+MAX_MESSAGE_LENGTH = 4096
+
+# Views, as encoded in page callbacks
+USERS = 'u'
+QUIZZES = 'q'
+SCORE_HISTORY = 'h'
+
+def split_message(entries: Iterable[str], header: str = '', limit: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """Join entries into message texts of at most limit characters.
+
+    Messages are only split between entries, so Markdown inside an entry is
+    never cut in half, unless a single entry is longer than a message.
+    """
+    text = header
+    for entry in entries:
+        if len(text) + len(entry) > limit and text:
+            yield text
+            text = ''
+        while len(entry) > limit:
+            yield entry[:limit]
+            entry = entry[limit:]
+        text += entry
+    if text:
+        yield text
+
+def page_keyboard(view: str, rows: List[tuple], more: bool, direction: Optional[str],
+                  lang: str = 'en') -> Optional[InlineKeyboardMarkup]:
+    """Prev/next buttons for a page whose rows end in their (sort value, id) cursor.
+
+    ``direction`` is how the page was reached, or None for the first page;
+    ``more`` says whether rows lie beyond the page in that direction.
+    """
+    newer = more if direction == callbacks.NEWER else direction is not None
+    older = more if direction != callbacks.NEWER else True
+    buttons = []
+    if newer:
+        buttons.append(InlineKeyboardButton(
+            translate_ui(messages.PAGE_PREV, lang), callback_data=callbacks.encode_page(view, callbacks.NEWER, rows[0][-2:])
+        ))
+    if older:
+        buttons.append(InlineKeyboardButton(
+            translate_ui(messages.PAGE_NEXT, lang), callback_data=callbacks.encode_page(view, callbacks.OLDER, rows[-1][-2:])
+        ))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
@@ -0,0 +1,77 @@
+"""
+Check the UI translation catalogs against the strings in messages.py.
+
+For every language in LANGUAGES, reports strings the catalog is missing,
+entries for strings that no longer exist, and translations whose ``{0}``
+fields differ from the English template. Exits non-zero if anything is off.
+With ``--draft``, missing strings are machine-translated and written to
+the catalog for review, and stale entries are dropped.
+
+    python -m src.utils.catalog
+    python -m src.utils.catalog --draft
+"""
+import argparse
+import json
+import logging
+import os
+import string
+import sys
+
+from src.core.constants import LANGUAGES, TRANSLATION_CATALOG_DIR
+from src.database.database import write_behind
+from src.handlers.messages import UI_STRINGS
+from src.utils.utils import CatalogBackend, translate_batch
+
+def template_fields(text):
+    return sorted(field for _, field, _, _ in string.Formatter().parse(text) if field is not None)
+
+def check_catalog(catalog, texts=UI_STRINGS):
+    """(missing, stale, mismatched) strings of a catalog."""
+    missing = [text for text in texts if text not in catalog]
+    stale = [text for text in catalog if text not in texts]
+    mismatched = [
+        text for text in texts
+        if text in catalog and template_fields(catalog[text]) != template_fields(text)
+    ]
+    return missing, stale, mismatched
+
+def write_catalog(path, catalog, texts=UI_STRINGS):
+    """Write a catalog with its entries in the order of texts."""
+    ordered = {text: catalog[text] for text in texts if text in catalog}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ordered, f, ensure_ascii=False, indent=1)
+        f.write('\n')
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default=TRANSLATION_CATALOG_DIR)
+    parser.add_argument('--draft', action='store_true', help="machine-translate missing strings")
+    args = parser.parse_args()
+
+    backend = CatalogBackend(args.directory)
+    problems = 0
+    for lang in LANGUAGES:
+        if lang == 'en':
+            continue
+        catalog = dict(backend.catalog(lang))
+        missing, stale, mismatched = check_catalog(catalog)
+        for label, texts in (('missing', missing), ('stale', stale), ('fields differ', mismatched)):
+            for text in texts:
+                print(f"{lang}: {label}: {text!r}")
+        if args.draft and (missing or stale):
+            drafted = {
+                text: translated for text, translated in zip(missing, translate_batch(missing, lang)) if translated
+            }
+            catalog.update(drafted)
+            write_catalog(os.path.join(args.directory, f"{lang}.json"), catalog)
+            print(f"{lang}: drafted {len(drafted)} entries, dropped {len(stale)}")
+            missing = [text for text in missing if text not in drafted]
+            stale = []
+        problems += len(missing) + len(stale) + len(mismatched)
+    # Keep the drafted translations in the translation cache too
+    write_behind.flush()
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
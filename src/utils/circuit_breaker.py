@@ -0,0 +1,59 @@
+import time
+from typing import Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """Stops calls to a failing dependency, then probes it before letting traffic back.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    every call is refused for ``reset_timeout`` seconds. The first call after
+    that is let through as a probe (half-open); its success closes the
+    breaker, its failure opens it again for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._metrics = {'opened': 0, 'refused': 0}
+
+    def allow_request(self) -> bool:
+        """Whether a call may go ahead now. In half-open state only one probe is let through."""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == CLOSED:
+            return True
+        # A probe that never reported back (e.g. it was cancelled) is given up on after reset_timeout
+        if self.state == HALF_OPEN and (
+            not self._probing or time.monotonic() - self._probe_started >= self.reset_timeout
+        ):
+            self._probing = True
+            self._probe_started = time.monotonic()
+            return True
+        self._metrics['refused'] += 1
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self._metrics['opened'] += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def metrics(self) -> Dict:
+        return dict(self._metrics, state=self.state, failures=self._failures)
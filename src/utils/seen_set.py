@@ -0,0 +1,85 @@
+import math
+import struct
+from typing import Optional
+
+_HEADER = struct.Struct('<BI')
+_VERSION = 1
+_MASK = (1 << 64) - 1
+
+def _mix(value: int) -> int:
+    # splitmix64 finalizer, so neighbouring ids land far apart
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+class SeenSet:
+    """Question ids a user has been sent, as two rotating Bloom filters.
+
+    New ids go into the current filter. Once it holds ``capacity`` ids it
+    becomes the previous filter and a fresh one is started, so at least the
+    last ``capacity`` ids (and at most twice that) are remembered in a fixed
+    amount of memory, with a ``error_rate`` chance of an unseen id looking
+    seen. The whole set serializes to a single blob.
+    """
+    __slots__ = ('capacity', 'hashes', 'bits', 'count', 'current', 'previous')
+
+    def __init__(self, capacity: int = 1000, error_rate: float = 0.01):
+        self.capacity = capacity
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2 / 8)
+        self.bits = size * 8
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self.current = bytearray(size)
+        self.previous: Optional[bytearray] = None
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, question_id: int):
+        value = _mix(question_id)
+        first, step = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(first + i * step) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _test(bits: bytearray, positions) -> bool:
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, question_id: int) -> bool:
+        positions = self._positions(question_id)
+        return self._test(self.current, positions) or (
+            self.previous is not None and self._test(self.previous, positions)
+        )
+
+    def add(self, question_id: int):
+        if question_id in self:
+            return
+        if self.count >= self.capacity:
+            self.previous, self.current = self.current, bytearray(len(self.current))
+            self.count = 0
+        for position in self._positions(question_id):
+            self.current[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_VERSION, self.count) + self.current + (self.previous or b'')
+
+    @classmethod
+    def from_bytes(cls, blob: Optional[bytes], capacity: int = 1000, error_rate: float = 0.01) -> 'SeenSet':
+        """Load a serialized set. A missing blob, or one written with other parameters, gives an empty set."""
+        seen = cls(capacity, error_rate)
+        if not blob or len(blob) < _HEADER.size:
+            return seen
+        version, count = _HEADER.unpack_from(blob)
+        size = len(seen.current)
+        body = blob[_HEADER.size:]
+        if version != _VERSION or len(body) not in (size, 2 * size):
+            return seen
+        seen.count = count
+        seen.current = bytearray(body[:size])
+        if len(body) == 2 * size:
+            seen.previous = bytearray(body[size:])
+        return seen
@@ -1,13 +1,238 @@
+from abc import ABC, abstractmethod
 from deep_translator import GoogleTranslator
-from src.core.constants import LANGUAGES
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.core.constants import (
+    TRANSLATION_CATALOG_DIR,
+    TRANSLATION_THREADS,
+    TRANSLATION_TIMEOUT,
+    TRANSLATION_CACHE_SIZE
+)
+from src.database.database import get_cached_translation, write_behind
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import threading
+
+# Bounded pool for blocking translator calls so they never run on the event loop
+_translation_pool = ThreadPoolExecutor(max_workers=TRANSLATION_THREADS, thread_name_prefix='translate')
+
+class TranslationCache:
+    """Two-tier translation cache keyed by (text hash, language).
+
+    Lookups hit an in-process LRU first and fall back to the SQLite
+    ``translations`` table, which survives restarts. New translations reach
+    the table with the next write-behind flush, since they are made on the
+    translation threads and only the writer thread may write.
+    """
+
+    def __init__(self, max_size=TRANSLATION_CACHE_SIZE):
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def get_memory(self, text, lang):
+        """Look up the in-process tier only. Safe to call on the event loop."""
+        key = (self.text_hash(text), lang)
+        with self._lock:
+            translated = self._memory.get(key)
+            if translated is not None:
+                self._memory.move_to_end(key)
+            return translated
+
+    def get(self, text, lang):
+        """Look up both tiers, promoting database hits into memory."""
+        translated = self.get_memory(text, lang)
+        if translated is None:
+            translated = get_cached_translation(self.text_hash(text), lang)
+            if translated is not None:
+                self._remember(self.text_hash(text), lang, translated)
+        return translated
+
+    def put(self, text, lang, translated):
+        text_hash = self.text_hash(text)
+        self._remember(text_hash, lang, translated)
+        write_behind.store_translation(text_hash, lang, translated)
+
+    def _remember(self, text_hash, lang, translated):
+        with self._lock:
+            self._memory[(text_hash, lang)] = translated
+            self._memory.move_to_end((text_hash, lang))
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+translation_cache = TranslationCache()
+
+class TranslationBackend(ABC):
+    """Translates English text into a language.
+
+    ``translate`` returns None when the backend has no translation, so the
+    caller decides what to fall back to.
+    """
+
+    @abstractmethod
+    def translate(self, text, lang):
+        """The translation of text into lang, or None."""
+
+    def translate_batch(self, texts, lang):
+        return [self.translate(text, lang) for text in texts]
+
+class CatalogBackend(TranslationBackend):
+    """Translations read from precompiled catalogs, one ``<lang>.json`` per language.
+
+    Each catalog maps the English text of a UI string to its translation.
+    A language's catalog is loaded the first time it is asked for and kept
+    as a dict, so lookups never touch the network or the disk again.
+    """
+
+    def __init__(self, directory=TRANSLATION_CATALOG_DIR):
+        self.directory = directory
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def catalog(self, lang):
+        catalog = self._catalogs.get(lang)
+        if catalog is None:
+            with self._lock:
+                catalog = self._catalogs.get(lang)
+                if catalog is None:
+                    catalog = self._catalogs[lang] = self._load(lang)
+        return catalog
+
+    def _load(self, lang):
+        path = os.path.join(self.directory, f"{lang}.json")
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error loading translation catalog {path}: {e}")
+            return {}
+
+    def translate(self, text, lang):
+        return self.catalog(lang).get(text)
+
+class NetworkBackend(TranslationBackend):
+    """Google Translate behind the two-tier translation cache. Blocking, so it runs on the translation pool."""
+
+    def translate(self, text, lang):
+        return translate_text(text, lang)
+
+    def translate_batch(self, texts, lang):
+        return translate_batch(texts, lang)
+
+# The bot's own strings come from the catalogs; only quiz content goes over the network
+ui_backend = CatalogBackend()
+content_backend = NetworkBackend()
+
+def translate_ui(text, lang):
+    """The bot's own UI text in lang, falling back to English if the catalog lacks it."""
+    if lang == 'en':
+        return text
+    translated = ui_backend.translate(text, lang)
+    if translated is None:
+        logging.warning(f"No {lang} catalog entry for {text!r}")
+        # Remember the fallback so the warning is logged once per string
+        ui_backend.catalog(lang)[text] = translated = text
+    return translated
+
+def translate_template(template, lang, *args):
+    """Translate a UI template with positional fields, then fill them in."""
+    translated = translate_ui(template, lang)
+    try:
+        return translated.format(*args)
+    except (IndexError, KeyError, ValueError):
+        logging.error(f"Translated template for {lang} lost its fields: {translated!r}")
+        return template.format(*args)
 
 def translate_text(text, lang):
-    """Translate text to the user's preferred language."""
+    """Translate text to the user's preferred language. Returns None if the translator fails.
+
+    Only real translations are cached, so a failure is retried next time.
+    """
     if lang == 'en':
         return text
+    cached = translation_cache.get(text, lang)
+    if cached is not None:
+        return cached
     try:
-        return GoogleTranslator(source='en', target=lang).translate(text)
+        translated = GoogleTranslator(source='en', target=lang).translate(text)
     except Exception as e:
         logging.error(f"Translation error: {e}")
-        return text 
\ No newline at end of file
+        return None
+    translated = translated.strip() if translated else None
+    if translated:
+        translation_cache.put(text, lang, translated)
+    return translated
+
+# Google rejects requests over 5000 characters
+MAX_BATCH_CHARS = 4500
+
+def translate_batch(texts, lang):
+    """Translate a list of single-line texts with as few translator requests as possible.
+
+    Uncached texts are joined with newlines into requests of at most
+    MAX_BATCH_CHARS characters. If a response does not split back into the
+    expected number of lines, that chunk is translated one text at a time.
+    Texts the translator fails on come back as None and are not cached.
+    """
+    if lang == 'en':
+        return list(texts)
+    results = [translation_cache.get(text, lang) for text in texts]
+    missing = [i for i, cached in enumerate(results) if cached is None]
+
+    chunks, chunk, size = [], [], 0
+    for i in missing:
+        length = len(texts[i]) + 1
+        if chunk and size + length > MAX_BATCH_CHARS:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(i)
+        size += length
+    if chunk:
+        chunks.append(chunk)
+
+    for chunk in chunks:
+        joined = "\n".join(texts[i] for i in chunk)
+        try:
+            lines = GoogleTranslator(source='en', target=lang).translate(joined).split("\n")
+        except Exception as e:
+            logging.error(f"Batch translation error: {e}")
+            lines = []
+        if len(lines) != len(chunk):
+            # translate_text caches its own successes
+            for i in chunk:
+                results[i] = translate_text(texts[i], lang)
+            continue
+        for i, translated in zip(chunk, lines):
+            translated = translated.strip() or None
+            if translated:
+                translation_cache.put(texts[i], lang, translated)
+            results[i] = translated
+    return results
+
+async def translate_batch_async(texts, lang, timeout=TRANSLATION_TIMEOUT):
+    """Translate a list of texts on the translation pool. Pass timeout=None to wait indefinitely.
+
+    Texts that could not be translated, or all of them on timeout, come back as None.
+    """
+    if lang == 'en':
+        return list(texts)
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_translation_pool, content_backend.translate_batch, list(texts), lang),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logging.error(f"Batch translation to {lang} timed out after {timeout}s")
+        return [None] * len(texts)
+
+def shutdown_translation_pool():
+    """Stop the translation threads without waiting for in-flight calls."""
+    _translation_pool.shutdown(wait=False, cancel_futures=True)